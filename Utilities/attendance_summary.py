@@ -0,0 +1,103 @@
+from sqlalchemy import case, delete, func, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from models.attendance import AttendanceDailySummary, AttendanceRecord, AttendanceSession
+
+SUMMARY_COLUMNS = ("date", "class_name", "subject", "present", "absent", "late", "total")
+
+
+def _counted(status_value):
+    return func.sum(case((AttendanceRecord.status == status_value, 1), else_=0))
+
+
+def _summary_select():
+    """Daily counts computed from the records themselves, grouped like the summary table"""
+    return (
+        select(
+            AttendanceSession.date,
+            AttendanceSession.class_name,
+            AttendanceSession.subject,
+            _counted("present"),
+            _counted("absent"),
+            _counted("late"),
+            func.count(),
+        )
+        .select_from(AttendanceRecord)
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .group_by(AttendanceSession.date, AttendanceSession.class_name, AttendanceSession.subject)
+    )
+
+
+def session_keys(db: Session, session_ids) -> set[tuple]:
+    """(date, class_name, subject) of the given sessions; session_ids may be a list or a subquery"""
+    rows = db.exec(
+        select(AttendanceSession.date, AttendanceSession.class_name, AttendanceSession.subject)
+        .where(AttendanceSession.id.in_(session_ids))
+        .distinct()
+    ).all()
+    return {tuple(row) for row in rows}
+
+
+def _dialect_insert(db: Session):
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def refresh_daily_summary(db: Session, keys) -> None:
+    """Recompute the summary rows for the given (date, class_name, subject) keys.
+
+    Runs inside the caller's transaction, after its record changes are flushed,
+    so the summary commits (or rolls back) together with them. Keys whose
+    records are all gone lose their summary row.
+
+    Concurrent writers to one key are serialised on its summary row: the first
+    upsert zeroes and locks the rows (in key order, so two writers cannot
+    deadlock), and the recount that follows is a new statement, so under READ
+    COMMITTED it sees everything the previous lock holder committed.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return
+    table = AttendanceDailySummary.__table__
+    dialect_insert = _dialect_insert(db)
+    conflict_target = [table.c.date, table.c.class_name, table.c.subject]
+    counts = ("present", "absent", "late", "total")
+
+    lock = dialect_insert(table).values([
+        {"date": day, "class_name": class_name, "subject": subject, **dict.fromkeys(counts, 0)}
+        for day, class_name, subject in keys
+    ])
+    db.exec(lock.on_conflict_do_update(index_elements=conflict_target, set_=dict.fromkeys(counts, 0)))
+
+    session_key = tuple_(AttendanceSession.date, AttendanceSession.class_name, AttendanceSession.subject)
+    recount = dialect_insert(table).from_select(SUMMARY_COLUMNS, _summary_select().where(session_key.in_(keys)))
+    db.exec(recount.on_conflict_do_update(
+        index_elements=conflict_target,
+        set_={name: getattr(recount.excluded, name) for name in counts},
+    ))
+
+    summary_key = tuple_(AttendanceDailySummary.date, AttendanceDailySummary.class_name, AttendanceDailySummary.subject)
+    db.exec(delete(AttendanceDailySummary).where(summary_key.in_(keys), AttendanceDailySummary.total == 0))
+
+
+def rebuild_daily_summary(db: Session, check: bool = False) -> list[dict]:
+    """Compare the whole summary table with the records and, unless check is set, rewrite it.
+
+    Returns one entry per key that differed: {"key", "stored", "expected"}, with
+    None for a missing or stale row. The caller commits.
+    """
+    expected = {tuple(row[:3]): tuple(row[3:]) for row in db.exec(_summary_select()).all()}
+    stored = {
+        (row.date, row.class_name, row.subject): (row.present, row.absent, row.late, row.total)
+        for row in db.exec(select(AttendanceDailySummary)).scalars()
+    }
+    mismatches = [
+        {"key": key, "stored": stored.get(key), "expected": expected.get(key)}
+        for key in sorted(expected.keys() | stored.keys())
+        if stored.get(key) != expected.get(key)
+    ]
+    if not check:
+        db.exec(delete(AttendanceDailySummary))
+        db.exec(insert(AttendanceDailySummary).from_select(SUMMARY_COLUMNS, _summary_select()))
+    return mismatches
@@ -1,9 +1,13 @@
+import os
+from datetime import timedelta
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from Utilities.token import decode_access_token
-from sqlmodel import Session, select
-from database import get_session
-from models.users import User
+from Utilities.cache import CountingCache
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from models.users import User, UserPrincipal
 from uuid import UUID
 
 bearer_scheme = HTTPBearer()
@@ -14,22 +18,81 @@ ROLE_LEVEL = {
     "admin": 3,
 }
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    session: Session = Depends(get_session),
-):
-    token = credentials.credentials
-    payload = decode_access_token(token)
+# Principals by user id, so repeat requests skip the users table.
+# Entries are dropped explicitly when an admin changes a user; the TTL bounds
+# staleness for changes made elsewhere (other workers, direct DB edits).
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", "10000"))
+principal_cache = CountingCache(TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS))
+
+
+# Opt-in stateless mode: role checks trust the verified token claims and never touch
+# the database. Revocation then relies on the token lifetime, so tokens issued in
+# this mode are short-lived; the "ver" claim is still checked wherever the user
+# row is loaded (get_current_user, e.g. /me).
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+STATELESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("STATELESS_TOKEN_EXPIRE_MINUTES", "15"))
+
+
+def invalidate_principal(user_id: UUID):
+    principal_cache.invalidate(user_id)
+
+
+def access_token_lifetime() -> timedelta | None:
+    """Lifetime for newly issued tokens; None keeps the default from Utilities.token"""
+    if AUTH_STATELESS:
+        return timedelta(minutes=STATELESS_TOKEN_EXPIRE_MINUTES)
+    return None
+
+
+def _decode_credentials(credentials: HTTPAuthorizationCredentials) -> dict:
+    payload = decode_access_token(credentials.credentials)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user_id = payload.get("sub")
-    user = session.exec(select(User).where(User.id == UUID(user_id))).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    return user
+    return payload
+
+
+async def _load_principal(payload: dict, session: AsyncSession) -> UserPrincipal:
+    user_id = UUID(payload.get("sub"))
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        # awaited lookup: every authenticated request passes through here, so it must not block the event loop
+        user = await session.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal = UserPrincipal(id=user.id, email=user.email, role=user.role, token_version=user.token_version)
+        principal_cache.set(user_id, principal)
+    if payload.get("ver", 0) != principal.token_version:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return principal
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> UserPrincipal:
+    """Principal backed by the users table (through the cache), whatever the auth mode"""
+    return await _load_principal(_decode_credentials(credentials), session)
+
+
+async def get_token_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> UserPrincipal:
+    """Principal for role checks; answered from the token claims in stateless mode"""
+    payload = _decode_credentials(credentials)
+    if AUTH_STATELESS and payload.get("role"):
+        return UserPrincipal(
+            id=UUID(payload["sub"]),
+            email=payload.get("email"),
+            role=payload["role"],
+            token_version=payload.get("ver", 0),
+        )
+    # tokens issued before the role claim existed still go through the database
+    return await _load_principal(payload, session)
 
 def require_min_role(min_role: str):
-    async def checker(user=Depends(get_current_user)):
+    async def checker(user=Depends(get_token_principal)):
         if ROLE_LEVEL.get(user.role, 0) < ROLE_LEVEL.get(min_role, 0):
             raise HTTPException(status_code=403, detail="Insufficient privileges")
         return user
@@ -0,0 +1,74 @@
+import threading
+from cachetools import Cache
+
+_MISSING = object()
+
+
+class CountingCache:
+    """Thread-safe wrapper around a cachetools cache that counts hits and misses.
+
+    The wrapped cache decides eviction (LRU, TTL, per-item expiry); this class only
+    serialises access, since sync endpoints run in worker threads while async ones
+    share the event loop, and keeps the counters used to size it.
+
+    Callers that compute a value outside the lock (e.g. across an ``await``) should
+    take ``generation(key)`` first and store with ``set_if_unchanged`` so that an
+    ``invalidate`` or ``clear`` landing mid-computation is not undone by the late set.
+    """
+
+    def __init__(self, cache: Cache):
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._cache[key] = value
+
+    def generation(self, key):
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set_if_unchanged(self, key, value, generation) -> bool:
+        with self._lock:
+            if generation != (self._epoch, self._generations.get(key, 0)):
+                return False
+            self._cache[key] = value
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            expire = getattr(self._cache, "expire", None)
+            if expire is not None:
+                expire()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+            }
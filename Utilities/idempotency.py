@@ -0,0 +1,107 @@
+import hashlib
+import os
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from models.idempotency import IdempotencyKey
+
+# How long a key is remembered. Retries after that are treated as new requests.
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+class IdempotentRequest:
+    """One write guarded by an Idempotency-Key header.
+
+    Usage in a handler, all on the request's session:
+
+        request = IdempotentRequest(db, user.id, "POST /things/", key, payload.model_dump_json(exclude_unset=True))
+        if (replay := request.replay()) is not None:
+            return replay
+        ... write ...
+        request.remember(201, result.model_dump_json())
+        if (replay := request.commit()) is not None:
+            return replay
+        return result
+
+    Without a key every method is a no-op apart from commit(), so handlers keep one code path.
+    """
+
+    def __init__(self, db: Session, user_id: UUID, scope: str, key: str | None, body: str):
+        if key is not None and not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters",
+            )
+        self.db = db
+        self.user_id = user_id
+        self.scope = scope
+        self.key = key
+        self.fingerprint = hashlib.sha256(body.encode()).hexdigest()
+
+    def replay(self) -> Response | None:
+        """The stored response for this key, or None when the request has to run"""
+        if self.key is None:
+            return None
+        stored = self.db.exec(
+            select(IdempotencyKey).where(
+                IdempotencyKey.user_id == self.user_id,
+                IdempotencyKey.scope == self.scope,
+                IdempotencyKey.key == self.key,
+            )
+        ).first()
+        if stored is None:
+            return None
+        if stored.expires_at <= datetime.utcnow():
+            self.db.delete(stored)
+            self.db.flush()
+            return None
+        if stored.fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+        return Response(
+            content=stored.response_body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    def remember(self, status_code: int, response_body: str):
+        """Stage the response in the same transaction as the write it describes"""
+        if self.key is None:
+            return
+        now = datetime.utcnow()
+        self.db.add(IdempotencyKey(
+            user_id=self.user_id,
+            scope=self.scope,
+            key=self.key,
+            fingerprint=self.fingerprint,
+            status_code=status_code,
+            response_body=response_body,
+            created_at=now,
+            expires_at=now + timedelta(seconds=IDEMPOTENCY_KEY_TTL_SECONDS),
+        ))
+
+    def commit(self) -> Response | None:
+        """Commit the write; if a concurrent retry won the race, roll back and replay its response"""
+        try:
+            self.db.commit()
+        except IntegrityError:
+            if self.key is None:
+                raise
+            self.db.rollback()
+            replay = self.replay()
+            if replay is None:
+                raise
+            return replay
+        return None
+
+
+def purge_expired_keys(db: Session) -> int:
+    """Delete expired keys (uses the expires_at index); the caller commits"""
+    result = db.exec(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+    return result.rowcount
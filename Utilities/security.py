@@ -1,9 +1,90 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost factor (log2 of the work). Hashes made with any other cost are
+# flagged by needs_rehash and replaced after the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small dedicated thread pool hashes in parallel
+# without borrowing the request thread pool. At most WORKERS + QUEUE_LIMIT jobs
+# may be running or waiting; past that callers get PasswordHasherBusy right away.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+# Bulk provisioning hashes a whole batch at once, one thread per core, outside the bounded pool
+PASSWORD_BULK_HASH_WORKERS = int(os.getenv("PASSWORD_BULK_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing pool already holds as much work as it is allowed to queue."""
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 4, max_rounds: int = 16, samples: int = 3):
+    """Time bcrypt at increasing cost on this machine.
+
+    Returns (rounds, timings) where rounds is the highest cost whose median hash
+    time stays within target_ms (never below min_rounds) and timings maps each
+    measured cost to its median in milliseconds.
+    """
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            context.hash("calibration-password")
+            durations.append((time.perf_counter() - started) * 1000)
+        timings[rounds] = sorted(durations)[len(durations) // 2]
+        if timings[rounds] > target_ms:
+            break  # each extra round doubles the cost, higher ones only get slower
+        chosen = rounds
+    return chosen, timings
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    with ThreadPoolExecutor(max_workers=PASSWORD_BULK_HASH_WORKERS, thread_name_prefix="password-bulk-hash") as pool:
+        return list(pool.map(hash_password, passwords))
+
+
+async def _run_bounded(fn, *args):
+    slots = _hash_slots
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    future = _hash_executor.submit(fn, *args)
+    # the slot is freed when the job finishes, even if the request was cancelled meanwhile
+    future.add_done_callback(lambda _: slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_bounded(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_bounded(verify_password, plain_password, hashed_password)
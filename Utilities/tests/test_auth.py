@@ -2,13 +2,26 @@ import pytest
 from uuid import uuid4
 from fastapi import HTTPException
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlmodel import Session
-from unittest.mock import patch, MagicMock
-
-from Utilities.auth import get_current_user, require_min_role
+from sqlmodel.ext.asyncio.session import AsyncSession
+from unittest.mock import patch, AsyncMock
+
+from Utilities.auth import (
+    get_current_user,
+    get_token_principal,
+    require_min_role,
+    principal_cache,
+    invalidate_principal,
+)
 from models.users import User
 
 
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
 @pytest.fixture
 def mock_user():
     return User(
@@ -29,9 +42,9 @@ def mock_credentials():
 
 @pytest.fixture
 def mock_session(mock_user):
-    # Fake a SQLModel session where .exec().first() returns mock_user
-    session = MagicMock(spec=Session)
-    session.exec.return_value.first.return_value = mock_user
+    # Fake an async SQLModel session where await .get() returns mock_user
+    session = AsyncMock(spec=AsyncSession)
+    session.get.return_value = mock_user
     return session
 
 
@@ -41,7 +54,37 @@ async def test_get_current_user_valid_token(mock_decode, mock_credentials, mock_
     mock_decode.return_value = {"sub": str(mock_user.id)}
 
     user = await get_current_user(mock_credentials, mock_session)
-    assert user == mock_user
+    assert user.id == mock_user.id
+    assert user.role == mock_user.role
+    assert user.email == mock_user.email
+
+
+@patch("Utilities.auth.decode_access_token")
+@pytest.mark.asyncio
+async def test_get_current_user_served_from_cache(mock_decode, mock_credentials, mock_session, mock_user):
+    mock_decode.return_value = {"sub": str(mock_user.id)}
+    hits_before = principal_cache.hits
+
+    first = await get_current_user(mock_credentials, mock_session)
+    second = await get_current_user(mock_credentials, mock_session)
+
+    assert first == second
+    assert mock_session.get.await_count == 1
+    assert principal_cache.hits == hits_before + 1
+
+
+@patch("Utilities.auth.decode_access_token")
+@pytest.mark.asyncio
+async def test_invalidate_principal_forces_reload(mock_decode, mock_credentials, mock_session, mock_user):
+    mock_decode.return_value = {"sub": str(mock_user.id)}
+
+    await get_current_user(mock_credentials, mock_session)
+    invalidate_principal(mock_user.id)
+    mock_user.role = "teacher"
+    user = await get_current_user(mock_credentials, mock_session)
+
+    assert mock_session.get.await_count == 2
+    assert user.role == "teacher"
 
 
 @patch("Utilities.auth.decode_access_token")
@@ -59,8 +102,8 @@ async def test_get_current_user_invalid_token(mock_decode, mock_credentials, moc
 @pytest.mark.asyncio
 async def test_get_current_user_user_not_found(mock_decode, mock_credentials):
     mock_decode.return_value = {"sub": str(uuid4())}
-    session = MagicMock(spec=Session)
-    session.exec.return_value.first.return_value = None
+    session = AsyncMock(spec=AsyncSession)
+    session.get.return_value = None
 
     with pytest.raises(HTTPException) as exc:
         await get_current_user(mock_credentials, session)
@@ -68,6 +111,44 @@ async def test_get_current_user_user_not_found(mock_decode, mock_credentials):
     assert exc.value.detail == "User not found"
 
 
+@patch("Utilities.auth.decode_access_token")
+@pytest.mark.asyncio
+async def test_get_current_user_rejects_stale_token_version(mock_decode, mock_credentials, mock_session, mock_user):
+    mock_user.token_version = 2
+    mock_decode.return_value = {"sub": str(mock_user.id), "ver": 1}
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(mock_credentials, mock_session)
+    assert exc.value.status_code == 401
+    assert exc.value.detail == "Token has been revoked"
+
+
+@patch("Utilities.auth.AUTH_STATELESS", True)
+@patch("Utilities.auth.decode_access_token")
+@pytest.mark.asyncio
+async def test_token_principal_stateless_skips_database(mock_decode, mock_credentials, mock_session):
+    user_id = uuid4()
+    mock_decode.return_value = {"sub": str(user_id), "role": "teacher", "email": "t@example.com", "ver": 0}
+
+    principal = await get_token_principal(mock_credentials, mock_session)
+
+    assert principal.id == user_id
+    assert principal.role == "teacher"
+    mock_session.get.assert_not_called()
+
+
+@patch("Utilities.auth.AUTH_STATELESS", True)
+@patch("Utilities.auth.decode_access_token")
+@pytest.mark.asyncio
+async def test_token_principal_stateless_falls_back_without_role_claim(mock_decode, mock_credentials, mock_session, mock_user):
+    mock_decode.return_value = {"sub": str(mock_user.id)}
+
+    principal = await get_token_principal(mock_credentials, mock_session)
+
+    assert principal.role == mock_user.role
+    assert mock_session.get.await_count == 1
+
+
 @pytest.mark.asyncio
 async def test_require_min_role_allows_admin(mock_user):
     mock_user.role = "admin"
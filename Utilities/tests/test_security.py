@@ -1,5 +1,17 @@
+import threading
 import pytest
-from Utilities.security import hash_password, verify_password
+from unittest.mock import patch
+from passlib.context import CryptContext
+from Utilities.security import (
+    BCRYPT_ROUNDS,
+    calibrate_bcrypt_rounds,
+    needs_rehash,
+    hash_password,
+    verify_password,
+    hash_password_async,
+    verify_password_async,
+    PasswordHasherBusy,
+)
 
 
 def test_hash_password_returns_different_values_for_same_input():
@@ -22,3 +34,39 @@ def test_verify_password_failure():
     wrong = "wrongpassword456"
     hashed = hash_password(plain)
     assert verify_password(wrong, hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_async_hash_and_verify_round_trip():
+    hashed = await hash_password_async("offloaded-secret")
+    assert await verify_password_async("offloaded-secret", hashed) is True
+    assert await verify_password_async("wrong-secret", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_async_hash_rejects_when_pool_is_full():
+    with patch("Utilities.security._hash_slots", threading.BoundedSemaphore(1)) as slots:
+        slots.acquire()
+        with pytest.raises(PasswordHasherBusy):
+            await hash_password_async("queued-secret")
+        slots.release()
+        # a freed slot is usable again and is returned once the job completes
+        assert await hash_password_async("queued-secret")
+        assert slots.acquire(blocking=False)
+
+
+def test_needs_rehash_flags_other_costs_only():
+    cheap = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("secret")
+    assert needs_rehash(cheap) is True
+    assert needs_rehash(hash_password("secret")) is False
+    assert hash_password("secret").startswith(f"$2b${BCRYPT_ROUNDS:02d}$")
+
+
+def test_calibrate_bcrypt_rounds_respects_budget():
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=10_000, min_rounds=4, max_rounds=5, samples=1)
+    assert rounds == 5
+    assert set(timings) == {4, 5}
+
+    rounds, timings = calibrate_bcrypt_rounds(target_ms=0, min_rounds=4, max_rounds=6, samples=1)
+    assert rounds == 4
+    assert list(timings) == [4]
@@ -1,8 +1,11 @@
+import hashlib
+import time
 import pytest
 from datetime import timedelta, datetime
+from unittest.mock import patch
 from jose import jwt
 
-from Utilities.token import create_access_token, decode_access_token
+from Utilities.token import create_access_token, decode_access_token, verified_token_cache
 
 SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
@@ -56,3 +59,55 @@ def test_decode_access_token_with_wrong_secret_returns_none():
 
     result = decode_access_token(token)
     assert result is None
+
+
+def test_decode_access_token_is_served_from_cache():
+    verified_token_cache.clear()
+    token = create_access_token({"sub": "cached-user"})
+    misses_before = verified_token_cache.misses
+
+    first = decode_access_token(token)
+    hits_before = verified_token_cache.hits
+    second = decode_access_token(token)
+
+    assert first == second
+    assert verified_token_cache.misses == misses_before + 1
+    assert verified_token_cache.hits == hits_before + 1
+
+
+def test_cached_payload_cannot_be_mutated_by_callers():
+    verified_token_cache.clear()
+    token = create_access_token({"sub": "immutable-user"})
+
+    decode_access_token(token)["sub"] = "tampered"
+
+    assert decode_access_token(token)["sub"] == "immutable-user"
+
+
+def test_cached_token_expires_with_its_exp():
+    verified_token_cache.clear()
+    token = create_access_token({"sub": "short-lived"}, expires_delta=timedelta(minutes=5))
+    decoded = decode_access_token(token)
+
+    with patch("Utilities.token.time.time", return_value=decoded["exp"] + 1):
+        assert verified_token_cache.get(hashlib.sha256(token.encode()).digest()) is None
+
+
+def test_decode_cache_micro_benchmark():
+    token = create_access_token({"sub": "bench-user", "role": "student"})
+    rounds = 2000
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        verified_token_cache.clear()
+        decode_access_token(token)
+    uncached = (time.perf_counter() - started) / rounds
+
+    decode_access_token(token)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        decode_access_token(token)
+    cached = (time.perf_counter() - started) / rounds
+
+    print(f"decode_access_token: {uncached * 1e6:.1f} us verified, {cached * 1e6:.1f} us cached")
+    assert cached < uncached
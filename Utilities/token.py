@@ -1,10 +1,29 @@
+import hashlib
+import os
+import time
+from cachetools import TLRUCache
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+from Utilities.cache import CountingCache
 
 SECRET_KEY = "your-secret-key" #coming from environment
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 24*60
 
+# Tokens that already passed signature and claim checks, keyed by their SHA-256.
+# Each entry lives until the token's own exp, so a cached token is never
+# accepted past the point where jwt.decode would have rejected it.
+TOKEN_CACHE_MAXSIZE = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))
+
+
+def _token_expiry(key, payload, now):
+    return payload["exp"]
+
+
+verified_token_cache = CountingCache(
+    TLRUCache(maxsize=TOKEN_CACHE_MAXSIZE, ttu=_token_expiry, timer=lambda: time.time())
+)
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -12,7 +31,15 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def decode_access_token(token: str):
+    key = hashlib.sha256(token.encode()).digest()
+    payload = verified_token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
     try:
-        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    # tokens without exp would never leave the cache, so only bounded ones are kept
+    if isinstance(payload.get("exp"), (int, float)):
+        verified_token_cache.set(key, dict(payload))
+    return payload
@@ -17,7 +17,7 @@ if config.config_file_name is not None:
 
 
 
-from models import students, notifications, attendance, classroom, events, fee_receipt, teachers, users
+from models import students, notifications, attendance, classroom, events, fee_receipt, teachers, users, idempotency
 from services.gallary import models
 from services.diary import models
 # add your model's MetaData object here
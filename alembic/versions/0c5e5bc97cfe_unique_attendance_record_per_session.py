@@ -0,0 +1,42 @@
+"""make (session_id, student_id) unique on attendancerecord
+
+Revision ID: 0c5e5bc97cfe
+Revises: 830c9749aa8d
+Create Date: 2026-10-17 12:31:47.208815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c5e5bc97cfe'
+down_revision: Union[str, None] = '830c9749aa8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # concurrent PATCHes could insert the same student twice; keep one row per pair
+    op.execute(
+        """
+        DELETE FROM attendancerecord WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY session_id, student_id ORDER BY id) AS rn
+                FROM attendancerecord
+            ) ranked
+            WHERE rn > 1
+        )
+        """
+    )
+    op.drop_index('ix_attendancerecord_session_id_student_id', table_name='attendancerecord')
+    op.create_index('uq_attendancerecord_session_id_student_id', 'attendancerecord', ['session_id', 'student_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_attendancerecord_session_id_student_id', table_name='attendancerecord')
+    op.create_index('ix_attendancerecord_session_id_student_id', 'attendancerecord', ['session_id', 'student_id'], unique=False)
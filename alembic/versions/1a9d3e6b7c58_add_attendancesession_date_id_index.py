@@ -0,0 +1,28 @@
+"""add (date, id) index for keyset pagination of attendance sessions
+
+Revision ID: 1a9d3e6b7c58
+Revises: f2a6c8d40b19
+Create Date: 2026-10-17 19:02:17.530981
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1a9d3e6b7c58'
+down_revision: Union[str, None] = 'f2a6c8d40b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_attendancesession_date_id', 'attendancesession', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendancesession_date_id', table_name='attendancesession')
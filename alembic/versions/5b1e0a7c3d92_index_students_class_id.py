@@ -0,0 +1,28 @@
+"""index students.class_id for class-scoped attendance queries
+
+Revision ID: 5b1e0a7c3d92
+Revises: 0c5e5bc97cfe
+Create Date: 2026-10-17 14:05:12.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e0a7c3d92'
+down_revision: Union[str, None] = '0c5e5bc97cfe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_students_class_id'), 'students', ['class_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_students_class_id'), table_name='students')
@@ -0,0 +1,34 @@
+"""add composite indexes for attendance queries
+
+Revision ID: 830c9749aa8d
+Revises: 623ec2e5f084
+Create Date: 2026-10-17 11:40:03.551920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '830c9749aa8d'
+down_revision: Union[str, None] = '623ec2e5f084'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_attendancerecord_session_id_student_id', 'attendancerecord', ['session_id', 'student_id'], unique=False)
+    op.create_index('ix_attendancerecord_student_id_session_id', 'attendancerecord', ['student_id', 'session_id'], unique=False)
+    op.create_index('ix_attendancesession_date_class_name', 'attendancesession', ['date', 'class_name'], unique=False)
+    op.create_index('ix_attendancesession_teacher_id_date', 'attendancesession', ['teacher_id', 'date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attendancesession_teacher_id_date', table_name='attendancesession')
+    op.drop_index('ix_attendancesession_date_class_name', table_name='attendancesession')
+    op.drop_index('ix_attendancerecord_student_id_session_id', table_name='attendancerecord')
+    op.drop_index('ix_attendancerecord_session_id_student_id', table_name='attendancerecord')
@@ -0,0 +1,50 @@
+"""add attendancedailysummary table
+
+Revision ID: 9e4f27b1c6a8
+Revises: 5b1e0a7c3d92
+Create Date: 2026-10-17 15:22:40.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4f27b1c6a8'
+down_revision: Union[str, None] = '5b1e0a7c3d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('attendancedailysummary',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('class_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('subject', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('present', sa.Integer(), nullable=False),
+    sa.Column('absent', sa.Integer(), nullable=False),
+    sa.Column('late', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('date', 'class_name', 'subject')
+    )
+    # backfill from existing records; `python manage.py rebuild-attendance-summary` does the same later on
+    op.execute("""
+        INSERT INTO attendancedailysummary (date, class_name, subject, present, absent, late, total)
+        SELECT s.date, s.class_name, s.subject,
+               SUM(CASE WHEN r.status = 'present' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN r.status = 'absent' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN r.status = 'late' THEN 1 ELSE 0 END),
+               COUNT(*)
+        FROM attendancerecord r
+        JOIN attendancesession s ON s.id = r.session_id
+        GROUP BY s.date, s.class_name, s.subject
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('attendancedailysummary')
@@ -0,0 +1,73 @@
+"""store attendance status as a smallint code and drop redundant student names
+
+Revision ID: b3d8f05e1a47
+Revises: 9e4f27b1c6a8
+Create Date: 2026-10-17 16:48:09.771530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8f05e1a47'
+down_revision: Union[str, None] = '9e4f27b1c6a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# must match ATTENDANCE_STATUS_CODES in models/attendance.py
+STATUS_CODES = {'present': 1, 'absent': 2, 'late': 3}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('attendancerecord', sa.Column('status_code', sa.SmallInteger(), nullable=True))
+    cases = " ".join(f"WHEN '{name}' THEN {code}" for name, code in STATUS_CODES.items())
+    op.execute(f"UPDATE attendancerecord SET status_code = CASE LOWER(TRIM(status)) {cases} END")
+
+    unknown = op.get_bind().execute(
+        sa.text("SELECT DISTINCT status FROM attendancerecord WHERE status_code IS NULL")
+    ).scalars().all()
+    if unknown:
+        raise RuntimeError(f"attendancerecord.status has values with no code, map them first: {unknown}")
+
+    with op.batch_alter_table('attendancerecord') as batch_op:
+        batch_op.drop_column('status')
+        batch_op.alter_column('status_code', new_column_name='status', existing_type=sa.SmallInteger(), nullable=False)
+
+    # the summary backfill in 9e4f27b1c6a8 matched the raw text exactly, so legacy
+    # values like 'Absent ' were counted in total only; recount from the codes
+    counts = ",\n               ".join(
+        f"SUM(CASE WHEN r.status = {code} THEN 1 ELSE 0 END)" for code in STATUS_CODES.values()
+    )
+    op.execute("DELETE FROM attendancedailysummary")
+    op.execute(f"""
+        INSERT INTO attendancedailysummary (date, class_name, subject, {', '.join(STATUS_CODES)}, total)
+        SELECT s.date, s.class_name, s.subject,
+               {counts},
+               COUNT(*)
+        FROM attendancerecord r
+        JOIN attendancesession s ON s.id = r.session_id
+        GROUP BY s.date, s.class_name, s.subject
+    """)
+
+    # names of known students are read from students.name from now on
+    op.execute("UPDATE attendancerecord SET student_name = NULL WHERE student_id IN (SELECT id FROM students)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "UPDATE attendancerecord SET student_name = "
+        "(SELECT name FROM students WHERE students.id = attendancerecord.student_id) "
+        "WHERE student_name IS NULL"
+    )
+    op.add_column('attendancerecord', sa.Column('status_text', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+    cases = " ".join(f"WHEN {code} THEN '{name}'" for name, code in STATUS_CODES.items())
+    op.execute(f"UPDATE attendancerecord SET status_text = CASE status {cases} END")
+    with op.batch_alter_table('attendancerecord') as batch_op:
+        batch_op.drop_column('status')
+        batch_op.alter_column('status_text', new_column_name='status', existing_type=sa.String(), nullable=False)
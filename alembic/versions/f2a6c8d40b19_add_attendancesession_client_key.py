@@ -0,0 +1,31 @@
+"""add attendancesession.client_key for offline batch sync
+
+Revision ID: f2a6c8d40b19
+Revises: d71c4a9e2f03
+Create Date: 2026-10-17 18:20:33.418760
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a6c8d40b19'
+down_revision: Union[str, None] = 'd71c4a9e2f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('attendancesession', sa.Column('client_key', sqlmodel.sql.sqltypes.AutoString(length=64), nullable=True))
+    op.create_index('uq_attendancesession_client_key_teacher_id', 'attendancesession', ['client_key', 'teacher_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_attendancesession_client_key_teacher_id', table_name='attendancesession')
+    op.drop_column('attendancesession', 'client_key')
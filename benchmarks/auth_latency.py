@@ -0,0 +1,171 @@
+"""
+Latency benchmark for the authentication dependency under concurrent load.
+
+Runs the same protected endpoint twice: once with the old lookup (a synchronous
+Session query executed inside the async dependency, i.e. on the event loop) and
+once with the current awaited lookup in Utilities.auth (principal cache disabled).
+Every statement gets an artificial delay to stand in for the network round trip
+to Postgres; on the async path the delay runs in the driver thread, the way a
+real round trip would, so only the blocking variant stalls the loop.
+
+Usage (from the repository root):
+
+    python -m benchmarks.auth_latency --requests 500 --concurrency 50 --db-latency-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import aiosqlite
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from uuid import UUID
+
+from database import get_async_session, get_session
+from models.users import User
+from models import students  # registers Student/Teacher for the User relationships
+from cachetools import TTLCache
+from Utilities import auth
+from Utilities.auth import bearer_scheme, get_token_principal, require_min_role
+from Utilities.cache import CountingCache
+from Utilities.token import create_access_token, decode_access_token
+
+BENCH_DB = "./bench.db"
+
+
+async def blocking_get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    session: Session = Depends(get_session),
+):
+    """The dependency as it was before: sync query inside an async def."""
+    payload = decode_access_token(credentials.credentials)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    user = session.exec(select(User).where(User.id == UUID(payload.get("sub")))).first()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def build_app(sync_engine, async_engine):
+    app = FastAPI()
+
+    @app.get("/probe")
+    async def probe(user=Depends(require_min_role("student"))):
+        return {"role": user.role}
+
+    def override_get_session():
+        with Session(sync_engine) as session:
+            yield session
+
+    async def override_get_async_session():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = override_get_session
+    app.dependency_overrides[get_async_session] = override_get_async_session
+    return app
+
+
+def add_sync_latency(engine, delay):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _sleep(*args):
+        time.sleep(delay)
+
+
+def add_async_latency(delay):
+    original = aiosqlite.Connection._execute
+
+    async def delayed_execute(self, fn, *args, **kwargs):
+        if getattr(fn, "__name__", "") == "execute":
+            inner = fn
+
+            def fn(*a, **kw):
+                time.sleep(delay)
+                return inner(*a, **kw)
+
+        return await original(self, fn, *args, **kwargs)
+
+    aiosqlite.Connection._execute = delayed_execute
+
+
+async def run_load(app, token, total, concurrency):
+    latencies = []
+    gate = asyncio.Semaphore(concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            async with gate:
+                started = time.perf_counter()
+                res = await client.get("/probe", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                assert res.status_code == 200, res.text
+
+        # warm-up round opens the pooled connections; it is not measured
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        latencies.clear()
+        await asyncio.gather(*(one() for _ in range(total)))
+    return latencies
+
+
+def summarize(label, latencies):
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    mean = statistics.fmean(ordered) * 1000
+    print(f"{label:<10} n={len(ordered):<5} mean={mean:8.2f} ms  p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    delay = args.db_latency_ms / 1000
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    # one connection per in-flight request, so pool waits do not blur the comparison
+    sync_engine = create_engine(f"sqlite:///{BENCH_DB}", connect_args={"check_same_thread": False},
+                                pool_size=args.concurrency, max_overflow=0)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{BENCH_DB}",
+                                       pool_size=args.concurrency, max_overflow=0)
+    SQLModel.metadata.create_all(sync_engine)
+    with Session(sync_engine) as session:
+        user = User(email="bench@example.com", hashed_password="x", role="teacher")
+        session.add(user)
+        session.commit()
+        token = create_access_token({"sub": str(user.id), "role": user.role})
+
+    add_sync_latency(sync_engine, delay)
+    add_async_latency(delay)
+    app = build_app(sync_engine, async_engine)
+
+    # with the principal cache on, the awaited path would never reach the database
+    auth.principal_cache = CountingCache(TTLCache(maxsize=1, ttl=0))
+
+    app.dependency_overrides[get_token_principal] = blocking_get_current_user
+    before = asyncio.run(run_load(app, token, args.requests, args.concurrency))
+    del app.dependency_overrides[get_token_principal]
+    after = asyncio.run(run_load(app, token, args.requests, args.concurrency))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.db_latency_ms} ms per statement")
+    summarize("blocking", before)
+    summarize("awaited", after)
+    os.remove(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,152 @@
-# from sqlmodel import create_engine, SQLModel, Session
-# from fastapi import Depends, FastAPI, HTTPException, Query
-# from typing import Annotated
-# # from Utilities.settings import settings
-
-
-# # make sure to set the database URL in your .env file
-# # DATABASE_URL=sqlite:///./database.db
-
-# sqlite_file_name = "database.db"
-# sqlite_url = f"sqlite:///{sqlite_file_name}"
-
-# connect_args = {"check_same_thread": False}
-# engine = create_engine(sqlite_url, connect_args=connect_args)
-
-
-# def create_db_and_tables():
-#     SQLModel.metadata.create_all(engine)
-
-
-# def get_session():
-#     with Session(engine) as session:
-#         yield session
-
-
-# SessionDep = Annotated[Session, Depends(get_session)]
-# # this is dependency to be injected
-
-
-
-
-
 from dotenv import load_dotenv
 import os
+import threading
+import time
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from fastapi import Depends
 from typing import Annotated
 
-# Load .env.local instead of default .env
 load_dotenv(dotenv_path=".env.local")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-engine = create_engine(DATABASE_URL, echo=True)
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver (asyncpg / aiosqlite)"""
+    scheme, _, rest = url.partition("://")
+    driver = scheme.split("+")[0]
+    if driver in ("postgresql", "postgres"):
+        # asyncpg spells libpq's sslmode as ssl
+        return "postgresql+asyncpg://" + rest.replace("sslmode=", "ssl=")
+    if driver == "sqlite":
+        return "sqlite+aiosqlite://" + rest
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+# Connection pool tuning, overridable per deployment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_ECHO = os.getenv("DB_ECHO", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Counters for connection checkouts, collected from the instrumented pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+
+    def record_checkout(self, waited: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def record_timeout(self, waited: float):
+        with self._lock:
+            self.timeouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "total_wait_ms": round(self.total_wait * 1000, 3),
+                "avg_wait_ms": round(self.total_wait * 1000 / attempts, 3) if attempts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+            }
+
+
+class _CheckoutTimingMixin:
+    """Records how long callers wait for a connection; each pool class owns its metrics."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout(time.perf_counter() - started)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    metrics = PoolMetrics()
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    metrics = PoolMetrics()
+
+
+def engine_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        # in-memory SQLite keeps one connection per thread, a queue pool does not apply
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool)
+)
+
+
+def _pool_status(pool) -> dict:
+    status = {
+        "pool_class": type(pool).__name__,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pre_ping": DB_POOL_PRE_PING,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow_in_use=max(pool.overflow(), 0),
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
+
+
+def get_pool_status() -> dict:
+    return {
+        "sync": _pool_status(engine.pool),
+        "async": _pool_status(async_engine.pool),
+    }
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -50,3 +156,9 @@ def get_session():
         yield session
 
 SessionDep = Annotated[Session, Depends(get_session)]
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
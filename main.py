@@ -2,8 +2,8 @@
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.routing import APIRoute
-from database import create_db_and_tables, get_session, SessionDep
-from routers import students, teachers, fee_recipt, notifications, events, attendance, auth, classroom
+from database import create_db_and_tables, get_session, SessionDep, async_engine
+from routers import students, teachers, fee_recipt, notifications, events, attendance, auth, classroom, admin
 from services.gallary.routes import Gallary_route
 from services.diary.routes import Diary_router
 from services.feepost.routes import fee_router
@@ -24,6 +24,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[attendance.NEXT_CURSOR_HEADER],  # cursor pagination, read by browser clients
 )
 
 @app.get("/", tags=["Root"])
@@ -70,6 +71,7 @@ def patch_test():
 
 # Include all routers
 app.include_router(auth.router)
+app.include_router(admin.router)
 app.include_router(students.router)
 app.include_router(teachers.router)
 app.include_router(classroom.router)
@@ -86,7 +88,12 @@ app.include_router(fee_router)
 def on_startup():
     create_db_and_tables()
     # Sample data can be added here if needed
-    
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await async_engine.dispose()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,81 @@
+"""
+Maintenance commands.
+
+    python manage.py calibrate-bcrypt --target-ms 250
+    python manage.py rebuild-attendance-summary [--check]
+    python manage.py purge-idempotency-keys
+"""
+import argparse
+
+
+def calibrate_bcrypt(args):
+    from Utilities.security import calibrate_bcrypt_rounds
+
+    rounds, timings = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds, args.samples)
+    for cost, ms in timings.items():
+        marker = "  <- selected" if cost == rounds else ""
+        print(f"rounds={cost:<3} {ms:9.1f} ms{marker}")
+    if timings[rounds] > args.target_ms:
+        print(f"Even rounds={rounds} exceeds {args.target_ms} ms on this machine")
+    print(f"BCRYPT_ROUNDS={rounds}")
+
+
+def rebuild_attendance_summary(args):
+    from sqlmodel import Session
+    from database import engine
+    from Utilities.attendance_summary import rebuild_daily_summary
+
+    with Session(engine) as session:
+        mismatches = rebuild_daily_summary(session, check=args.check)
+        for mismatch in mismatches:
+            print(f"{mismatch['key']}: stored={mismatch['stored']} expected={mismatch['expected']}")
+        if args.check:
+            print(f"{len(mismatches)} summary rows out of date")
+            if mismatches:
+                raise SystemExit(1)
+        else:
+            session.commit()
+            print(f"Summary rebuilt, {len(mismatches)} rows corrected")
+
+
+def purge_idempotency_keys(args):
+    from sqlmodel import Session
+    from database import engine
+    from Utilities.idempotency import purge_expired_keys
+
+    with Session(engine) as session:
+        deleted = purge_expired_keys(session)
+        session.commit()
+    print(f"Deleted {deleted} expired idempotency keys")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First Step School server maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    calibrate = commands.add_parser(
+        "calibrate-bcrypt",
+        help="pick the highest bcrypt cost that hashes within a target login latency",
+    )
+    calibrate.add_argument("--target-ms", type=float, default=250.0, help="latency budget for one hash")
+    calibrate.add_argument("--min-rounds", type=int, default=4)
+    calibrate.add_argument("--max-rounds", type=int, default=16)
+    calibrate.add_argument("--samples", type=int, default=3, help="hashes timed per cost (median is used)")
+    calibrate.set_defaults(handler=calibrate_bcrypt)
+
+    rebuild = commands.add_parser(
+        "rebuild-attendance-summary",
+        help="recompute the daily attendance summary from the records (backfill / repair)",
+    )
+    rebuild.add_argument("--check", action="store_true", help="only report differences, exit 1 if any")
+    rebuild.set_defaults(handler=rebuild_attendance_summary)
+
+    purge = commands.add_parser("purge-idempotency-keys", help="delete idempotency keys past their TTL")
+    purge.set_defaults(handler=purge_idempotency_keys)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,63 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index, SmallInteger
+from sqlalchemy.types import TypeDecorator
 from typing import Optional
 from uuid import UUID, uuid4
+import datetime
 from datetime import date
+from enum import Enum as PyEnum
+
+
+class AttendanceStatus(str, PyEnum):
+    PRESENT = "present"
+    ABSENT = "absent"
+    LATE = "late"
+
+
+# Stored codes; append new statuses with new numbers, never renumber existing ones
+ATTENDANCE_STATUS_CODES = {
+    AttendanceStatus.PRESENT: 1,
+    AttendanceStatus.ABSENT: 2,
+    AttendanceStatus.LATE: 3,
+}
+
+
+class AttendanceStatusType(TypeDecorator):
+    """AttendanceStatus in the API, a SMALLINT on disk"""
+    impl = SmallInteger
+    cache_ok = True
+
+    _by_code = {code: member for member, code in ATTENDANCE_STATUS_CODES.items()}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return ATTENDANCE_STATUS_CODES[AttendanceStatus(value)]
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._by_code[value]
 
 
 class AttendanceRecordBase(SQLModel):
     student_id: UUID
-    status: str  # "present", "absent", etc.
+    status: AttendanceStatus = Field(sa_type=AttendanceStatusType)
+    # Stored only for students missing from the students table; reads resolve
+    # the name from students.name and fall back to this column.
     student_name: str|None = None
 
 
 class AttendanceRecord(AttendanceRecordBase, table=True):
+    __table_args__ = (
+        # a student appears once per session; also the conflict target of the PATCH upsert
+        Index("uq_attendancerecord_session_id_student_id", "session_id", "student_id", unique=True),
+        # a student's history joined to sessions (calendar, /student/{id}/)
+        Index("ix_attendancerecord_student_id_session_id", "student_id", "session_id"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     session_id: UUID = Field(foreign_key="attendancesession.id")
     session: Optional["AttendanceSession"] = Relationship(back_populates="records")
@@ -33,26 +80,114 @@ class AttendanceSessionBase(SQLModel):
 
 
 class AttendanceSession(AttendanceSessionBase, table=True):
+    __table_args__ = (
+        Index("ix_attendancesession_date_class_name", "date", "class_name"),
+        Index("ix_attendancesession_teacher_id_date", "teacher_id", "date"),
+        # client_key first so it does not compete with ix_attendancesession_teacher_id_date for teacher lookups
+        Index("uq_attendancesession_client_key_teacher_id", "client_key", "teacher_id", unique=True),
+        # keyset pagination of /attendance/sessions/ walks this index backwards
+        Index("ix_attendancesession_date_id", "date", "id"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
+    # set by offline clients (batch sync) so a replayed upload finds the session it already
+    # created; unique per teacher, since different devices may generate the same key
+    client_key: str | None = Field(default=None, max_length=64)
     records: list[AttendanceRecord] = Relationship(back_populates="session")
 
 
+class AttendanceDailySummary(SQLModel, table=True):
+    """Per (date, class, subject) record counts, kept in step with attendancerecord by the writers"""
+    date: datetime.date = Field(primary_key=True)  # module-qualified: the field name shadows the type
+    class_name: str = Field(primary_key=True)
+    subject: str = Field(primary_key=True)
+    present: int = 0
+    absent: int = 0
+    late: int = 0
+    total: int = 0
+
+
 class AttendanceSessionCreate(AttendanceSessionBase):
     records: list[AttendanceRecordCreate]
 
 
+class AttendanceException(SQLModel):
+    student_id: UUID
+    status: AttendanceStatus
+
+
+class AttendanceCompactCreate(AttendanceSessionBase):
+    """Whole-class submission: everyone on the roster gets default_status except the listed students"""
+    default_status: AttendanceStatus = AttendanceStatus.PRESENT
+    exceptions: list[AttendanceException] = []
+
+
+class AttendanceBatchSession(AttendanceSessionCreate):
+    client_key: str = Field(min_length=1, max_length=64)
+
+
+class AttendanceBatchRequest(SQLModel):
+    sessions: list[AttendanceBatchSession] = Field(min_length=1, max_length=200)
+
+
+class AttendanceBatchResult(SQLModel):
+    client_key: str
+    status: str  # "created", "duplicate" (already uploaded) or "invalid"
+    session_id: UUID | None = None
+    detail: str | None = None
+
+
+class AttendanceBatchResponse(SQLModel):
+    created: int
+    duplicates: int
+    invalid: int
+    results: list[AttendanceBatchResult]
+
+
 class AttendanceSessionRead(AttendanceSessionBase):
     id: UUID
     records: list[AttendanceRecordRead] = []
 
 class AttendanceRecordUpdate(SQLModel):
     student_id: UUID
-    status: str  # "present", "absent", etc.
+    status: AttendanceStatus
     student_name: str | None = None
     
     
 class StudentMonthlyAttendanceEntry(SQLModel):
     date: date
-    status: str
+    status: AttendanceStatus
     subject: str
-    class_name: str
\ No newline at end of file
+    class_name: str
+
+
+class ClassAttendanceRow(SQLModel):
+    student_id: UUID
+    name: str
+    roll_number: int | None = None
+    days: str  # one character per day of the month, see ClassAttendanceMatrix.legend
+
+
+class ClassAttendanceMatrix(SQLModel):
+    class_name: str
+    month: str
+    legend: dict[str, str] = {"P": "present", "L": "late", "A": "absent", "-": "no record"}
+    students: list[ClassAttendanceRow] = []
+
+
+class AttendanceStatsEntry(SQLModel):
+    key: str  # student id, class name, subject or teacher id, depending on group_by
+    total: int
+    present: int
+    late: int
+    absent: int
+    attendance_percentage: float  # present + late over total
+
+
+class AttendanceStatsResponse(SQLModel):
+    group_by: str
+    start_date: date | None = None
+    end_date: date | None = None
+    total: int
+    offset: int
+    limit: int
+    items: list[AttendanceStatsEntry]
@@ -0,0 +1,22 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+from uuid import UUID, uuid4
+from datetime import datetime
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Stored outcome of a write made with an Idempotency-Key header, replayed on retries"""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # keys are chosen by clients, so they are only unique per user and endpoint
+        UniqueConstraint("user_id", "scope", "key", name="uq_idempotency_keys_user_id_scope_key"),
+    )
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID
+    scope: str  # e.g. "POST /attendance/"
+    key: str = Field(max_length=255)
+    fingerprint: str  # SHA-256 of the request body; a reused key must come with the same body
+    status_code: int
+    response_body: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
@@ -29,7 +29,7 @@ class StudentCreate(SQLModel):
     FatherContact: Optional[str] = Field(default=None)
     MotherContact: Optional[str] = Field(default=None)
     notification_token: Optional[str] = Field(default=None)
-    class_id: Optional[UUID] = Field(default=None, foreign_key="classrooms.id")
+    class_id: Optional[UUID] = Field(default=None, foreign_key="classrooms.id", index=True)
     user_id: Optional[UUID] = Field(default=None, foreign_key="users.id", unique=True)
     
     # New fields
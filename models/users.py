@@ -8,10 +8,19 @@ class User(SQLModel, table=True):
     email: str = Field(index=True, unique=True)
     hashed_password: str
     role: str # default role
+    token_version: int = Field(default=0)  # bumped to revoke previously issued tokens
     student_profile: Optional["Student"] = Relationship(back_populates="user")
     teacher_profile: Optional["Teacher"] | None = Relationship(back_populates="user")
     
 
 class AdminPasswordResetRequest(SQLModel):
     user_email: str
-    new_password: str
\ No newline at end of file
+    new_password: str
+
+
+class UserPrincipal(SQLModel):
+    """What the auth dependencies hand to routes: enough to authorise, safe to cache."""
+    id: UUID
+    email: str | None = None
+    role: str
+    token_version: int = 0
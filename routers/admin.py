@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+
+from database import get_pool_status
+from Utilities.auth import require_min_role, principal_cache
+from Utilities.token import verified_token_cache
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(require_min_role("admin"))],
+)
+
+
+@router.get("/db-pool")
+def read_db_pool_status():
+    """Connection pool usage: checked-out/idle connections, overflow and checkout wait times"""
+    return get_pool_status()
+
+
+@router.get("/auth-cache")
+def read_auth_cache_stats():
+    """Hit/miss counters and occupancy of the principal and verified-token caches"""
+    return {
+        "principals": principal_cache.stats(),
+        "tokens": verified_token_cache.stats(),
+    }
@@ -1,19 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+from cachetools import TTLCache
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
-from typing import List
-from uuid import UUID
+from sqlalchemy import case, insert, literal, tuple_, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from typing import List, Literal, Optional, Union
+from uuid import UUID, uuid4
 
 from models.attendance import (
     AttendanceSession,
+    AttendanceSessionBase,
+    AttendanceRecordCreate,
+    AttendanceCompactCreate,
+    AttendanceBatchSession,
+    AttendanceBatchRequest,
+    AttendanceBatchResult,
+    AttendanceBatchResponse,
     AttendanceSessionCreate,
     AttendanceSessionRead,
     AttendanceRecord,
     AttendanceRecordRead,
     AttendanceRecordUpdate,
-    StudentMonthlyAttendanceEntry
+    StudentMonthlyAttendanceEntry,
+    ClassAttendanceMatrix,
+    ClassAttendanceRow,
+    AttendanceStatsEntry,
+    AttendanceStatsResponse,
+    AttendanceDailySummary,
 )
-from database import SessionDep
-from Utilities.auth import require_min_role
+from models.students import Student
+from models.users import UserPrincipal
+from models.classroom import Classroom
+from database import SessionDep, AsyncSessionDep
+from Utilities.auth import require_min_role, get_token_principal
+from Utilities.cache import CountingCache
+from Utilities.attendance_summary import refresh_daily_summary, session_keys
+from Utilities.idempotency import IdempotentRequest
 
 router = APIRouter(
     prefix="/attendance",
@@ -22,30 +52,230 @@ router = APIRouter(
 )
 
 
-@router.post("/", status_code=status.HTTP_201_CREATED, response_model=AttendanceSessionRead)
-def create_attendance_session(session_data: AttendanceSessionCreate, session: SessionDep):
+def _student_names(db: Session, student_ids) -> dict[UUID, str]:
+    """Names of the given students that exist in the students table, in one query"""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return {}
+    return dict(db.exec(select(Student.id, Student.name).where(Student.id.in_(student_ids))).all())
+
+
+def _stored_name(record, names: dict[UUID, str]) -> str | None:
+    # the students table already has the name of known students, so it is not repeated on the record
+    return None if record.student_id in names else record.student_name
+
+
+def _select_records():
+    """Records shaped like AttendanceRecordRead, student_name resolved from the students table"""
+    return select(
+        AttendanceRecord.id,
+        AttendanceRecord.session_id,
+        AttendanceRecord.student_id,
+        AttendanceRecord.status,
+        func.coalesce(Student.name, AttendanceRecord.student_name).label("student_name"),
+    ).outerjoin(Student, Student.id == AttendanceRecord.student_id)
+
+
+def _records_by_session(db: Session, session_ids) -> dict[UUID, list[AttendanceRecordRead]]:
+    grouped = {session_id: [] for session_id in session_ids}
+    if grouped:
+        for row in db.exec(_select_records().where(AttendanceRecord.session_id.in_(grouped))).all():
+            grouped[row.session_id].append(AttendanceRecordRead(**row._mapping))
+    return grouped
+
+
+def _record_rows(session_id: UUID, records, names: dict[UUID, str]) -> list[dict]:
+    return [
+        {
+            "id": uuid4(),
+            "session_id": session_id,
+            "student_id": record.student_id,
+            "status": record.status,
+            "student_name": _stored_name(record, names),
+        }
+        for record in records
+    ]
+
+
+def _insert_records(db: Session, session_id: UUID, records, names=None) -> list[AttendanceRecordRead]:
+    """Write all records of a session with one batched INSERT and return them as read models"""
+    if names is None:
+        names = _student_names(db, [record.student_id for record in records])
+    rows = _record_rows(session_id, records, names)
+    if rows:
+        db.exec(insert(AttendanceRecord), params=rows)
+    return [
+        AttendanceRecordRead(**{**row, "student_name": names.get(row["student_id"], row["student_name"])})
+        for row in rows
+    ]
+
+
+def _repeated_students(records) -> list[UUID]:
+    """Students listed more than once; a session holds one record per student"""
+    seen, repeated = set(), []
+    for record in records:
+        if record.student_id in seen and record.student_id not in repeated:
+            repeated.append(record.student_id)
+        seen.add(record.student_id)
+    return repeated
+
+
+def _reject_repeated_students(records):
+    repeated = _repeated_students(records)
+    if repeated:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Students listed more than once: {[str(student_id) for student_id in repeated]}",
+        )
+
+
+def _summary_key(session_obj: AttendanceSession) -> tuple:
+    return (session_obj.date, session_obj.class_name, session_obj.subject)
+
+
+def _create_session(db: Session, sheet: AttendanceSessionBase, records, names=None) -> AttendanceSessionRead:
+    """Write a session and its records (uncommitted) and return what was written"""
     new_session = AttendanceSession(
-        date=session_data.date,
-        teacher_id=session_data.teacher_id,
-        subject=session_data.subject,
-        class_name=session_data.class_name
+        date=sheet.date,
+        teacher_id=sheet.teacher_id,
+        subject=sheet.subject,
+        class_name=sheet.class_name
     )
-    session.add(new_session)
-    session.commit()
-    session.refresh(new_session)
+    # session row and records go out in one transaction; the response is built
+    # from what was written, so no refresh round trips are needed
+    db.exec(insert(AttendanceSession), params=[new_session.model_dump()])
+    records = _insert_records(db, new_session.id, records, names)
+    refresh_daily_summary(db, [_summary_key(new_session)])
+    return AttendanceSessionRead(**new_session.model_dump(), records=records)
 
-    for record in session_data.records:
-        new_record = AttendanceRecord(
-            student_id=record.student_id,
-            status=record.status,
-            session_id=new_session.id,
-            student_name=record.student_name
-        )
-        session.add(new_record)
 
-    session.commit()
-    session.refresh(new_session)
-    return new_session
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=AttendanceSessionRead)
+def create_attendance_session(
+    session_data: AttendanceSessionCreate,
+    session: SessionDep,
+    user: UserPrincipal = Depends(get_token_principal),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    request = IdempotentRequest(
+        session, user.id, "POST /attendance/", idempotency_key, session_data.model_dump_json(exclude_unset=True)
+    )
+    if (replay := request.replay()) is not None:
+        return replay
+
+    _reject_repeated_students(session_data.records)
+
+    result = _create_session(session, session_data, session_data.records)
+    request.remember(status.HTTP_201_CREATED, result.model_dump_json())
+    if (replay := request.commit()) is not None:
+        return replay
+    _invalidate_calendars([record.student_id for record in result.records], result.date)
+    return result
+
+
+@router.post("/compact", status_code=status.HTTP_201_CREATED, response_model=AttendanceSessionRead)
+def create_compact_attendance_session(
+    sheet: AttendanceCompactCreate,
+    session: SessionDep,
+    user: UserPrincipal = Depends(get_token_principal),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+):
+    """Take the class roster, mark everyone with default_status except the listed students"""
+    request = IdempotentRequest(
+        session, user.id, "POST /attendance/compact", idempotency_key, sheet.model_dump_json(exclude_unset=True)
+    )
+    if (replay := request.replay()) is not None:
+        return replay
+
+    roster = dict(session.exec(
+        select(Student.id, Student.name)
+        .join(Classroom, Classroom.id == Student.class_id)
+        .where(Classroom.name == sheet.class_name)
+        .order_by(Student.roll_number, Student.name)
+    ).all())
+    if not roster:
+        raise HTTPException(status_code=404, detail=f"No students found in class '{sheet.class_name}'")
+
+    exceptions = {exception.student_id: exception.status for exception in sheet.exceptions}
+    outside = [str(student_id) for student_id in exceptions if student_id not in roster]
+    if outside:
+        raise HTTPException(status_code=400, detail=f"Students not in class '{sheet.class_name}': {outside}")
+
+    records = [
+        AttendanceRecordCreate(student_id=student_id, status=exceptions.get(student_id, sheet.default_status))
+        for student_id in roster
+    ]
+    result = _create_session(session, sheet, records, names=roster)
+    request.remember(status.HTTP_201_CREATED, result.model_dump_json())
+    if (replay := request.commit()) is not None:
+        return replay
+    _invalidate_calendars([record.student_id for record in result.records], result.date)
+    return result
+
+
+def _write_batch(db: Session, sessions: list[AttendanceBatchSession]) -> list[AttendanceBatchResult]:
+    """Insert the new sessions of a batch (uncommitted) and report on every one of them"""
+    # client keys are generated on teachers' devices, so they are only unique per teacher
+    keys = {(sheet.teacher_id, sheet.client_key) for sheet in sessions}
+    uploaded = {
+        (teacher_id, client_key): session_id
+        for teacher_id, client_key, session_id in db.exec(
+            select(AttendanceSession.teacher_id, AttendanceSession.client_key, AttendanceSession.id)
+            .where(tuple_(AttendanceSession.teacher_id, AttendanceSession.client_key).in_(keys))
+        ).all()
+    }
+    names = _student_names(db, [record.student_id for sheet in sessions for record in sheet.records])
+
+    results, session_rows, record_rows = [], [], []
+    for sheet in sessions:
+        key = (sheet.teacher_id, sheet.client_key)
+        if key in uploaded:
+            results.append(AttendanceBatchResult(
+                client_key=sheet.client_key, status="duplicate", session_id=uploaded[key]
+            ))
+            continue
+        if _repeated_students(sheet.records):
+            results.append(AttendanceBatchResult(
+                client_key=sheet.client_key, status="invalid", detail="A student appears more than once"
+            ))
+            continue
+        session_row = AttendanceSession(**sheet.model_dump(exclude={"records"})).model_dump()
+        uploaded[key] = session_row["id"]  # a key repeated later in the same batch is a duplicate
+        session_rows.append(session_row)
+        record_rows.extend(_record_rows(session_row["id"], sheet.records, names))
+        results.append(AttendanceBatchResult(client_key=sheet.client_key, status="created", session_id=session_row["id"]))
+
+    if session_rows:
+        db.exec(insert(AttendanceSession), params=session_rows)
+    if record_rows:
+        db.exec(insert(AttendanceRecord), params=record_rows)
+    refresh_daily_summary(db, [(row["date"], row["class_name"], row["subject"]) for row in session_rows])
+    return results
+
+
+@router.post("/batch", response_model=AttendanceBatchResponse)
+def upload_attendance_batch(batch: AttendanceBatchRequest, session: SessionDep):
+    """Offline sync: many sessions in one transaction, deduplicated by their client_key.
+
+    Uploading the same batch again is harmless: sessions whose client_key is
+    already stored for the same teacher come back as "duplicate" with the id of
+    the stored session.
+    """
+    try:
+        results = _write_batch(session, batch.sessions)
+        session.commit()
+    except IntegrityError:
+        # an overlapping upload committed some of these keys first; the retry reports them as duplicates
+        session.rollback()
+        results = _write_batch(session, batch.sessions)
+        session.commit()
+
+    for sheet, result in zip(batch.sessions, results):
+        if result.status == "created":
+            _invalidate_calendars([record.student_id for record in sheet.records], sheet.date)
+    counts = {outcome: sum(result.status == outcome for result in results) for outcome in ("created", "duplicate", "invalid")}
+    return AttendanceBatchResponse(
+        created=counts["created"], duplicates=counts["duplicate"], invalid=counts["invalid"], results=results
+    )
 
 
 @router.get("/session/{session_id}/", response_model=AttendanceSessionRead)
@@ -53,31 +283,77 @@ def get_attendance_session(session_id: UUID, session: SessionDep):
     session_data = session.get(AttendanceSession, session_id)
     if not session_data:
         raise HTTPException(status_code=404, detail="Session not found")
-    return session_data
+    records = _records_by_session(session, [session_id])[session_id]
+    return AttendanceSessionRead(**session_data.model_dump(), records=records)
 
 
 @router.get("/student/{student_id}/", response_model=List[AttendanceRecordRead])
 def get_student_attendance(student_id: UUID, session: SessionDep):
-    records = session.exec(
-        select(AttendanceRecord).where(AttendanceRecord.student_id == student_id)
-    ).all()
-    return records
+    rows = session.exec(_select_records().where(AttendanceRecord.student_id == student_id)).all()
+    return [AttendanceRecordRead(**row._mapping) for row in rows]
 
 from fastapi import Query
 from datetime import date
-from models.students import Student  # assuming Student model has `class_name`
 from sqlmodel import or_
 
+# Keyset pagination: lists are ordered newest first by (date, id) and a cursor holds
+# the last (date, id) seen, so a page never reads and discards the rows before it.
+# Where one index covers both keys (/sessions/, ix_attendancesession_date_id) a page
+# is a range scan that costs the same however deep it is. page/limit still work
+# (OFFSET) for older clients. The cursor for the following page is returned in the
+# X-Next-Cursor header.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_cursor(day: date, row_id: UUID) -> str:
+    raw = json.dumps([day.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, row_id = json.loads(raw)
+        return date.fromisoformat(day), UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _before(date_column, id_column, cursor: str):
+    """Rows strictly after the cursor in (date desc, id desc) order, as one row-value comparison"""
+    day, row_id = _decode_cursor(cursor)
+    return tuple_(date_column, id_column) < tuple_(
+        literal(day, type_=date_column.type), literal(row_id, type_=id_column.type)
+    )
+
+
+def _paginate(query, cursor: str | None, page: int, limit: int, date_column, id_column):
+    query = query.order_by(date_column.desc(), id_column.desc())
+    if cursor:
+        query = query.where(_before(date_column, id_column, cursor))
+    else:
+        query = query.offset((page - 1) * limit)
+    return query.limit(limit + 1)  # one extra row tells whether another page exists
+
+
+def _set_next_cursor(response: Response, rows: list, limit: int, date_of, id_of) -> list:
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(date_of(rows[-1]), id_of(rows[-1]))
+    return rows
+
+
 @router.get("/sessions/", response_model=List[AttendanceSessionRead])
 def get_attendance_sessions(
     session: SessionDep,
+    response: Response,
     class_name: str | None = Query(None, description="Class name to filter sessions"),
     date: date | None = Query(None, description="Date to filter sessions"),
     teacher_id: UUID | None = Query(None, description="Teacher ID to filter sessions"),
+    cursor: str | None = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header; replaces page"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100)
 ):
-    offset = (page - 1) * limit
     query = select(AttendanceSession)
 
     # Apply filters only if provided
@@ -88,87 +364,113 @@ def get_attendance_sessions(
     if teacher_id:
         query = query.where(AttendanceSession.teacher_id == teacher_id)
 
-    # Apply pagination
-    query = query.offset(offset).limit(limit)
-
-    sessions = session.exec(query).all()
-    return sessions
+    query = _paginate(query, cursor, page, limit, AttendanceSession.date, AttendanceSession.id)
+    sessions = _set_next_cursor(response, session.exec(query).all(), limit, lambda s: s.date, lambda s: s.id)
+    records = _records_by_session(session, [s.id for s in sessions])
+    return [AttendanceSessionRead(**s.model_dump(), records=records[s.id]) for s in sessions]
 
 @router.get("/records/filter/", response_model=List[AttendanceRecordRead])
 def get_filtered_attendance_records(
     session: SessionDep,
+    response: Response,
     class_name: str = Query(..., description="Class name to filter attendance"),
     date: date | None = Query(None, description="Date of the attendance session"),
     session_id: UUID | None = Query(None, description="Specific attendance session ID"),
+    cursor: str | None = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header; replaces page"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100)
 ):
-    offset = (page - 1) * limit
-
-    # Get students matching class_name
-    students_in_class = session.exec(
-        select(Student).where(Student.class_name == class_name)
-    ).all()
-    student_ids = [s.id for s in students_in_class]
-
-    if not student_ids:
-        raise HTTPException(status_code=404, detail=f"No students found in class '{class_name}'")
-
-    # Start filtering records
-    query = select(AttendanceRecord).where(AttendanceRecord.student_id.in_(student_ids))
-
+    # One joined query: class name -> its students -> their records -> the record's session.
+    # Newest sessions first, keyed by (session date, record id). The two keys live in
+    # different tables, so no index yields this order: every page sorts all of the
+    # class's matching records (a temp B-tree in SQLite) and gets slower as the class's
+    # history grows. The cursor only saves the OFFSET rows; filter by date or session_id
+    # to keep the sorted set small.
+    query = (
+        _select_records()
+        .add_columns(AttendanceSession.date.label("session_date"))
+        .join(Classroom, Classroom.id == Student.class_id)
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .where(Classroom.name == class_name)
+    )
     if session_id:
         query = query.where(AttendanceRecord.session_id == session_id)
-
     elif date:
-        sessions = session.exec(
-            select(AttendanceSession.id).where(AttendanceSession.date == date)
-        ).all()
-        session_ids = [s[0] for s in sessions]
-        if not session_ids:
-            return []
-        query = query.where(AttendanceRecord.session_id.in_(session_ids))
+        query = query.where(AttendanceSession.date == date)
 
-    query = query.offset(offset).limit(limit)
-    records = session.exec(query).all()
+    query = _paginate(query, cursor, page, limit, AttendanceSession.date, AttendanceRecord.id)
+    rows = _set_next_cursor(response, session.exec(query).all(), limit, lambda r: r.session_date, lambda r: r.id)
+    records = [AttendanceRecordRead(**row._mapping) for row in rows]
+
+    if not records and page == 1 and not cursor:
+        # only an empty first page pays for telling "no such class" apart from "no records"
+        has_students = session.exec(
+            select(Student.id)
+            .join(Classroom, Classroom.id == Student.class_id)
+            .where(Classroom.name == class_name)
+            .limit(1)
+        ).first()
+        if has_students is None:
+            raise HTTPException(status_code=404, detail=f"No students found in class '{class_name}'")
 
     return records
 
 
+def _upsert_records(db: Session, session_id: UUID, records) -> list[AttendanceRecordRead]:
+    """Insert or update records of a session with one INSERT ... ON CONFLICT DO UPDATE"""
+    latest = {record.student_id: record for record in records}  # a repeated student keeps its last entry
+    names = _student_names(db, latest)
+    table = AttendanceRecord.__table__
+    dialect_insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(table).values([
+        {
+            "id": uuid4(),
+            "session_id": session_id,
+            "student_id": record.student_id,
+            "status": record.status,
+            "student_name": _stored_name(record, names),
+        }
+        for record in latest.values()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.session_id, table.c.student_id],
+        set_={
+            "status": stmt.excluded.status,
+            "student_name": func.coalesce(stmt.excluded.student_name, table.c.student_name),
+        },
+    ).returning(*table.c)
+    return [
+        AttendanceRecordRead(**{**row._mapping, "student_name": names.get(row.student_id, row.student_name)})
+        for row in db.exec(stmt).all()
+    ]
+
 
-@router.patch("/session/{session_id}/update", response_model=AttendanceRecordRead)
+@router.patch(
+    "/session/{session_id}/update",
+    response_model=Union[AttendanceRecordRead, List[AttendanceRecordRead]]
+)
 def update_or_add_attendance_record(
     session_id: UUID,
-    record: AttendanceRecordUpdate,
-    db: SessionDep
+    db: SessionDep,
+    record: Union[AttendanceRecordUpdate, List[AttendanceRecordUpdate]] = Body(...),
 ):
+    """Set the status of one record, or of a list of records, creating any that are missing"""
     session_obj = db.get(AttendanceSession, session_id)
     if not session_obj:
         raise HTTPException(status_code=404, detail="Attendance session not found")
 
-    existing_record = db.exec(
-        select(AttendanceRecord).where(
-            AttendanceRecord.session_id == session_id,
-            AttendanceRecord.student_id == record.student_id
-        )
-    ).first()
+    records = record if isinstance(record, list) else [record]
+    if not records:
+        return []
+    saved = _upsert_records(db, session_id, records)
+    refresh_daily_summary(db, [_summary_key(session_obj)])
+    session_date = session_obj.date
+    db.commit()
+    _invalidate_calendars([record.student_id for record in saved], session_date)
 
-    if existing_record:
-        existing_record.status = record.status
-        db.add(existing_record)
-        db.commit()
-        db.refresh(existing_record)
-        return existing_record
-    else:
-        new_record = AttendanceRecord(
-            session_id=session_id,
-            student_id=record.student_id,
-            status=record.status
-        )
-        db.add(new_record)
-        db.commit()
-        db.refresh(new_record)
-        return new_record
+    if isinstance(record, list):
+        return saved
+    return saved[0]
 
 
 @router.delete("/session/{session_id}/student/{student_id}/", status_code=204)
@@ -188,23 +490,19 @@ def delete_attendance_record(
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
     db.delete(record)
+    db.flush()
+    session_obj = db.get(AttendanceSession, session_id)
+    refresh_daily_summary(db, [_summary_key(session_obj)])
+    session_date = session_obj.date
     db.commit()
+    _invalidate_calendars([student_id], session_date)
     return
 
 
 
 # cool that works
-@router.get(
-    "/student/{student_id}/calendar/",
-    response_model=List[StudentMonthlyAttendanceEntry],
-    tags=["attendance"]
-)
-def get_student_monthly_attendance_for_calendar(
-    student_id: UUID,
-    db: SessionDep,
-    month: str = Query(..., description="Month in YYYY-MM format")
-):
-    # Parse input month string to date range
+def _month_range(month: str) -> tuple[date, date]:
+    """[first day, first day of next month) for a YYYY-MM string"""
     try:
         year, month_num = map(int, month.split("-"))
         from_date = date(year, month_num, 1)
@@ -214,6 +512,76 @@ def get_student_monthly_attendance_for_calendar(
             to_date = date(year, month_num + 1, 1)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM.")
+    return from_date, to_date
+
+
+# Rendered calendar bodies of closed months by (student_id, "YYYY-MM"), with their
+# ETag. The current month is rendered on every request, so other worker processes
+# never serve it stale. Writes to a closed month (corrections) drop it after commit;
+# the TTL covers corrections made by other worker processes.
+CALENDAR_CACHE_TTL_SECONDS = int(os.getenv("CALENDAR_CACHE_TTL_SECONDS", "3600"))
+CALENDAR_CACHE_MAXSIZE = int(os.getenv("CALENDAR_CACHE_MAXSIZE", "20000"))
+calendar_cache = CountingCache(TTLCache(maxsize=CALENDAR_CACHE_MAXSIZE, ttl=CALENDAR_CACHE_TTL_SECONDS))
+
+# Closed months may be reused by clients for a day without asking; the current
+# month must be revalidated every time (cheap thanks to the ETag).
+CALENDAR_CLOSED_MONTH_MAX_AGE = int(os.getenv("CALENDAR_CLOSED_MONTH_MAX_AGE", str(24 * 60 * 60)))
+
+
+def _invalidate_calendars(student_ids, day: date):
+    today = date.today()
+    if (day.year, day.month) >= (today.year, today.month):
+        return  # only closed months are cached
+    month = day.strftime("%Y-%m")
+    for student_id in set(student_ids):
+        calendar_cache.invalidate((student_id, month))
+
+
+def _with_etag(body: bytes) -> tuple[str, bytes]:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"', body
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get(
+    "/student/{student_id}/calendar/",
+    response_model=List[StudentMonthlyAttendanceEntry],
+    tags=["attendance"]
+)
+async def get_student_monthly_attendance_for_calendar(
+    student_id: UUID,
+    db: AsyncSessionDep,
+    month: str = Query(..., description="Month in YYYY-MM format"),
+    if_none_match: str | None = Header(None, alias="If-None-Match"),
+):
+    from_date, to_date = _month_range(month)
+    if to_date <= date.today():
+        cache_control = f"private, max-age={CALENDAR_CLOSED_MONTH_MAX_AGE}"
+        cache_key = (student_id, from_date.strftime("%Y-%m"))
+        cached = calendar_cache.get(cache_key)
+        if cached is None:
+            # a write committing while we await the query bumps the generation, and
+            # then the body we rendered must not be cached
+            generation = calendar_cache.generation(cache_key)
+            cached = _with_etag(await _render_calendar(db, student_id, from_date, to_date))
+            calendar_cache.set_if_unchanged(cache_key, cached, generation)
+    else:
+        cache_control = "private, no-cache"
+        cached = _with_etag(await _render_calendar(db, student_id, from_date, to_date))
+    etag, body = cached
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _render_calendar(db, student_id: UUID, from_date: date, to_date: date) -> bytes:
 
     # Join AttendanceRecord with AttendanceSession to filter by date
     query = (
@@ -224,9 +592,10 @@ def get_student_monthly_attendance_for_calendar(
             AttendanceSession.date >= from_date,
             AttendanceSession.date < to_date
         )
+        .order_by(AttendanceSession.date, AttendanceSession.subject, AttendanceSession.id)
     )
 
-    results = db.exec(query).all()
+    results = (await db.exec(query)).all()
 
     # Transform joined results into desired output structure
     attendance_list = [
@@ -239,31 +608,340 @@ def get_student_monthly_attendance_for_calendar(
         for record, session in results
     ]
 
-    return attendance_list
+    return json.dumps([entry.model_dump(mode="json") for entry in attendance_list]).encode()
+
+
+
+# Day codes for the class matrix; when a student has several sessions on one day
+# the worst status wins (absent > late > present).
+_MATRIX_CODES = "-PLA"
+
+
+@router.get(
+    "/class/{class_name}/matrix/",
+    response_model=ClassAttendanceMatrix,
+    dependencies=[Depends(require_min_role("teacher"))],
+)
+async def get_class_attendance_matrix(
+    class_name: str,
+    db: AsyncSessionDep,
+    month: str = Query(..., description="Month in YYYY-MM format")
+):
+    """Monthly register for a whole class: every student with one status character per day"""
+    from_date, to_date = _month_range(month)
+
+    day_code = case(
+        (AttendanceRecord.status == "absent", 3),
+        (AttendanceRecord.status == "late", 2),
+        else_=1,
+    )
+    per_day = (
+        select(
+            AttendanceRecord.student_id.label("student_id"),
+            AttendanceSession.date.label("date"),
+            func.max(day_code).label("code"),
+        )
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .join(Student, Student.id == AttendanceRecord.student_id)
+        .join(Classroom, Classroom.id == Student.class_id)
+        .where(
+            Classroom.name == class_name,
+            AttendanceSession.date >= from_date,
+            AttendanceSession.date < to_date,
+        )
+        .group_by(AttendanceRecord.student_id, AttendanceSession.date)
+        .subquery()
+    )
+    # the roster is outer-joined so students without any record still get a row
+    query = (
+        select(Student.id, Student.name, Student.roll_number, per_day.c.date, per_day.c.code)
+        .join(Classroom, Classroom.id == Student.class_id)
+        .outerjoin(per_day, per_day.c.student_id == Student.id)
+        .where(Classroom.name == class_name)
+        .order_by(Student.roll_number, Student.name, Student.id)
+    )
+    rows = (await db.exec(query)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail=f"No students found in class '{class_name}'")
+
+    days_in_month = (to_date - from_date).days
+    registers: dict[UUID, tuple] = {}
+    for student_id, name, roll_number, day, code in rows:
+        _, _, cells = registers.setdefault(student_id, (name, roll_number, ["-"] * days_in_month))
+        if day is not None:
+            cells[day.day - 1] = _MATRIX_CODES[code]
+
+    return ClassAttendanceMatrix(
+        class_name=class_name,
+        month=from_date.strftime("%Y-%m"),
+        students=[
+            ClassAttendanceRow(student_id=student_id, name=name, roll_number=roll_number, days="".join(cells))
+            for student_id, (name, roll_number, cells) in registers.items()
+        ],
+    )
+
+
+# Aggregates are expensive and dashboards poll them, so identical requests are
+# answered from memory for a short while; the TTL bounds how stale they can be.
+ATTENDANCE_STATS_CACHE_TTL_SECONDS = int(os.getenv("ATTENDANCE_STATS_CACHE_TTL_SECONDS", "300"))
+attendance_stats_cache = CountingCache(TTLCache(maxsize=1024, ttl=ATTENDANCE_STATS_CACHE_TTL_SECONDS))
+
+_STATS_GROUP_COLUMNS = {
+    "student": AttendanceRecord.student_id,
+    "class": AttendanceSession.class_name,
+    "subject": AttendanceSession.subject,
+    "teacher": AttendanceSession.teacher_id,
+}
 
 
+@router.get(
+    "/stats/{group_by}/",
+    response_model=AttendanceStatsResponse,
+    dependencies=[Depends(require_min_role("teacher"))],
+)
+async def get_attendance_stats(
+    group_by: Literal["student", "class", "subject", "teacher"],
+    db: AsyncSessionDep,
+    response: Response,
+    start_date: date | None = Query(None, description="First day included"),
+    end_date: date | None = Query(None, description="Last day included"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Attendance counts and percentage per student, class, subject or teacher, computed in SQL"""
+    response.headers["Cache-Control"] = f"private, max-age={ATTENDANCE_STATS_CACHE_TTL_SECONDS}"
+    cache_key = (group_by, start_date, end_date, offset, limit)
+    cached = attendance_stats_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    key = _STATS_GROUP_COLUMNS[group_by]
+    filters = []
+    if start_date:
+        filters.append(AttendanceSession.date >= start_date)
+    if end_date:
+        filters.append(AttendanceSession.date <= end_date)
+
+    def counted(status_value):
+        return func.sum(case((AttendanceRecord.status == status_value, 1), else_=0))
+
+    grouped = (
+        select(
+            key.label("key"),
+            func.count().label("total"),
+            counted("present").label("present"),
+            counted("late").label("late"),
+            counted("absent").label("absent"),
+        )
+        .select_from(AttendanceRecord)
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .where(*filters)
+        .group_by(key)
+    )
+    total_groups = (await db.exec(select(func.count()).select_from(grouped.subquery()))).one()
+    rows = (await db.exec(grouped.order_by(key).offset(offset).limit(limit))).all()
+
+    result = AttendanceStatsResponse(
+        group_by=group_by,
+        start_date=start_date,
+        end_date=end_date,
+        total=total_groups,
+        offset=offset,
+        limit=limit,
+        items=[
+            AttendanceStatsEntry(
+                key=str(row.key),
+                total=row.total,
+                present=row.present,
+                late=row.late,
+                absent=row.absent,
+                attendance_percentage=round(100 * (row.present + row.late) / row.total, 2),
+            )
+            for row in rows
+        ],
+    )
+    attendance_stats_cache.set(cache_key, result)
+    return result
+
+
+@router.get(
+    "/summary/",
+    response_model=List[AttendanceDailySummary],
+    dependencies=[Depends(require_min_role("teacher"))],
+)
+async def get_daily_attendance_summary(
+    db: AsyncSessionDep,
+    start_date: date | None = Query(None, description="First day included"),
+    end_date: date | None = Query(None, description="Last day included"),
+    class_name: str | None = None,
+    subject: str | None = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """Per day, class and subject counts read from the maintained summary table"""
+    query = select(AttendanceDailySummary)
+    if start_date:
+        query = query.where(AttendanceDailySummary.date >= start_date)
+    if end_date:
+        query = query.where(AttendanceDailySummary.date <= end_date)
+    if class_name:
+        query = query.where(AttendanceDailySummary.class_name == class_name)
+    if subject:
+        query = query.where(AttendanceDailySummary.subject == subject)
+    query = query.order_by(
+        AttendanceDailySummary.date.desc(), AttendanceDailySummary.class_name, AttendanceDailySummary.subject
+    )
+    return (await db.exec(query.offset(offset).limit(limit))).all()
+
+
+EXPORT_BATCH_SIZE = 1000
+_EXPORT_COLUMNS = (
+    "session_id", "date", "class_name", "subject", "teacher_id",
+    "record_id", "student_id", "student_name", "status",
+)
+
+
+def _export_rows(bind, query):
+    """Stream rows from a server-side cursor, EXPORT_BATCH_SIZE at a time.
+
+    Runs after the handler returned, when the request session is already closed,
+    so it opens its own session on the same engine.
+    """
+    with Session(bind) as db:
+        result = db.exec(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+
+
+def _export_csv(bind, query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_EXPORT_COLUMNS)
+    yield buffer.getvalue()  # header goes out before the first row is read
+    for partition in _export_rows(bind, query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows((*row[:8], row.status.value) for row in partition)
+        yield buffer.getvalue()
+
+
+def _export_ndjson(bind, query):
+    for partition in _export_rows(bind, query):
+        yield "".join(
+            json.dumps({
+                **dict(zip(_EXPORT_COLUMNS, map(_json_value, row[:8]))),
+                "status": row.status.value,
+            }) + "\n"
+            for row in partition
+        )
+
+
+def _json_value(value):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+@router.get("/export/", dependencies=[Depends(require_min_role("admin"))])
+def export_attendance(
+    db: SessionDep,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    class_name: str | None = None,
+    format: Literal["csv", "ndjson"] = Query("csv"),
+):
+    """Every record of the sessions in [start_date, end_date] as CSV or NDJSON, streamed"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    query = (
+        select(
+            AttendanceSession.id,
+            AttendanceSession.date,
+            AttendanceSession.class_name,
+            AttendanceSession.subject,
+            AttendanceSession.teacher_id,
+            AttendanceRecord.id,
+            AttendanceRecord.student_id,
+            func.coalesce(Student.name, AttendanceRecord.student_name),
+            AttendanceRecord.status,
+        )
+        .join(AttendanceRecord, AttendanceRecord.session_id == AttendanceSession.id)
+        .outerjoin(Student, Student.id == AttendanceRecord.student_id)
+        .where(AttendanceSession.date >= start_date, AttendanceSession.date <= end_date)
+        .order_by(AttendanceSession.date, AttendanceSession.id)
+    )
+    if class_name:
+        query = query.where(AttendanceSession.class_name == class_name)
+
+    filename = f"attendance_{start_date}_{end_date}.{format}"
+    if format == "csv":
+        body, media_type = _export_csv(db.get_bind(), query), "text/csv"
+    else:
+        body, media_type = _export_ndjson(db.get_bind(), query), "application/x-ndjson"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _delete_sessions(db: Session, session_ids) -> tuple[int, int]:
+    """Delete the given sessions and their records with one statement per table.
+
+    session_ids may be a list or a scalar subquery of session ids. Returns
+    (deleted_sessions, deleted_records); the caller commits.
+    """
+    keys = session_keys(db, session_ids)
+    records = db.exec(
+        delete(AttendanceRecord)
+        .where(AttendanceRecord.session_id.in_(session_ids))
+        .execution_options(synchronize_session=False)
+    )
+    sessions = db.exec(
+        delete(AttendanceSession)
+        .where(AttendanceSession.id.in_(session_ids))
+        .execution_options(synchronize_session=False)
+    )
+    refresh_daily_summary(db, keys)
+    return sessions.rowcount, records.rowcount
+
 
 @router.delete("/session/{session_id}/", status_code=204)
 def delete_attendance_session(session_id: UUID, db: SessionDep):
-    session_obj = db.get(AttendanceSession, session_id)
-    if not session_obj:
-        raise HTTPException(status_code=404, detail="Attendance session not found")
-
-    # Delete associated attendance records
-    db.exec(
-        select(AttendanceRecord)
+    affected = db.exec(
+        select(AttendanceRecord.student_id, AttendanceSession.date)
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
         .where(AttendanceRecord.session_id == session_id)
     ).all()
-    records_to_delete = db.exec(
-        select(AttendanceRecord).where(AttendanceRecord.session_id == session_id)
-    ).all()
+    deleted_sessions, _ = _delete_sessions(db, [session_id])
+    if not deleted_sessions:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Attendance session not found")
+    db.commit()
+    if affected:
+        _invalidate_calendars([student_id for student_id, _ in affected], affected[0].date)
+
 
-    for record in records_to_delete:
-        db.delete(record)
+@router.delete("/sessions/")
+def delete_attendance_sessions_in_range(
+    db: SessionDep,
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    class_name: Optional[str] = None,
+    _=Depends(require_min_role("admin")),
+):
+    """Admin cleanup: delete every session dated between start_date and end_date (inclusive)"""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
 
-    # Delete the session itself
-    db.delete(session_obj)
+    session_ids = select(AttendanceSession.id).where(
+        AttendanceSession.date >= start_date,
+        AttendanceSession.date <= end_date,
+    )
+    if class_name:
+        session_ids = session_ids.where(AttendanceSession.class_name == class_name)
+
+    deleted_sessions, deleted_records = _delete_sessions(db, session_ids.scalar_subquery())
     db.commit()
+    calendar_cache.clear()  # may touch any number of students; cheaper than listing them
+    return {"deleted_sessions": deleted_sessions, "deleted_records": deleted_records}
 
 
 @router.put("/session/{session_id}/", response_model=AttendanceSessionRead)
@@ -272,28 +950,62 @@ def update_attendance_session_records(
     updated_data: AttendanceSessionCreate,  # full attendance session with records
     db: SessionDep
 ):
+    _reject_repeated_students(updated_data.records)
+
     # Fetch existing session (we won't modify its metadata)
     session_obj = db.get(AttendanceSession, session_id)
     if not session_obj:
         raise HTTPException(status_code=404, detail="Attendance session not found")
 
-    # Delete all previous records for this session
-    existing_records = db.exec(
-        select(AttendanceRecord).where(AttendanceRecord.session_id == session_id)
-    ).all()
-    for record in existing_records:
-        db.delete(record)
+    # Diff the stored sheet against the submitted one and touch only what changed,
+    # so unchanged students keep their record ids and rows
+    stored = {
+        row.student_id: row
+        for row in db.exec(
+            select(
+                AttendanceRecord.id,
+                AttendanceRecord.student_id,
+                AttendanceRecord.status,
+                AttendanceRecord.student_name,
+            ).where(AttendanceRecord.session_id == session_id)
+        ).all()
+    }
+    wanted = {record.student_id: record for record in updated_data.records}
+    names = _student_names(db, wanted)
+
+    removed = [row.id for student_id, row in stored.items() if student_id not in wanted]
+    added = [record for student_id, record in wanted.items() if student_id not in stored]
+    changed = [
+        {"id": stored[student_id].id, "status": record.status, "student_name": _stored_name(record, names)}
+        for student_id, record in wanted.items()
+        if student_id in stored
+        and (stored[student_id].status, stored[student_id].student_name) != (record.status, _stored_name(record, names))
+    ]
 
-    # Add all new records from the request
-    for record in updated_data.records:
-        new_record = AttendanceRecord(
+    if removed:
+        db.exec(
+            delete(AttendanceRecord)
+            .where(AttendanceRecord.id.in_(removed))
+            .execution_options(synchronize_session=False)
+        )
+    if changed:
+        db.exec(update(AttendanceRecord), params=changed)  # bulk UPDATE by primary key
+    inserted = {record.student_id: record for record in _insert_records(db, session_id, added, names)}
+    if removed or changed or added:
+        refresh_daily_summary(db, [_summary_key(session_obj)])
+    session_fields = session_obj.model_dump()  # read before commit expires the instance
+    db.commit()
+    if removed or changed or added:
+        _invalidate_calendars(stored.keys() | wanted.keys(), session_fields["date"])
+
+    records = [
+        inserted.get(student_id) or AttendanceRecordRead(
+            id=stored[student_id].id,
             session_id=session_id,
-            student_id=record.student_id,
+            student_id=student_id,
             status=record.status,
-            student_name=record.student_name
+            student_name=names.get(student_id, record.student_name),
         )
-        db.add(new_record)
-
-    db.commit()
-    db.refresh(session_obj)
-    return session_obj
+        for student_id, record in wanted.items()
+    ]
+    return AttendanceSessionRead(**session_fields, records=records)
@@ -1,13 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, Path
+import csv
+import io
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, UploadFile, File, BackgroundTasks
 from sqlmodel import Session, select
-from database import get_session
-from models.users import User, AdminPasswordResetRequest
-from Utilities.security import hash_password, verify_password
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.orm import selectinload
+from database import get_session, get_async_session
+from models.users import User, UserPrincipal, AdminPasswordResetRequest
+from Utilities.security import (
+    hash_password,
+    hash_passwords,
+    hash_password_async,
+    verify_password_async,
+    needs_rehash,
+    PasswordHasherBusy,
+)
 from Utilities.token import create_access_token
-from pydantic import BaseModel
-from Utilities.auth import get_current_user, require_min_role
+from pydantic import BaseModel, ValidationError
+from Utilities.auth import (
+    ROLE_LEVEL,
+    get_current_user,
+    require_min_role,
+    invalidate_principal,
+    access_token_lifetime,
+)
 from typing import List
-from uuid import UUID
+from uuid import UUID, uuid4
 
 router = APIRouter()
 
@@ -27,32 +46,93 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class BulkRegisterRowResult(BaseModel):
+    row: int
+    email: str | None = None
+    status: str  # "created", "conflict" or "invalid"
+    id: UUID | None = None
+    detail: str | None = None
+
+
+class BulkRegisterResponse(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: List[BulkRegisterRowResult]
+
+
 # ----------------------
 # Authentication Routes
 # ----------------------
 
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/register")
-def register(data: RegisterRequest, session: Session = Depends(get_session)):
-    existing = session.exec(select(User).where(User.email == data.email)).first()
+async def register(data: RegisterRequest, session: AsyncSession = Depends(get_async_session)):
+    existing = (await session.exec(select(User).where(User.email == data.email))).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
+    try:
+        hashed_password = await hash_password_async(data.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     user = User(
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=hashed_password,
         role=data.role
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return {"id": user.id, "email": user.email}
 
 
+async def _rehash_password(bind, user_id: UUID, old_hash: str, password: str):
+    """Upgrade a hash made with an outdated bcrypt cost; runs after the login response"""
+    try:
+        new_hash = await hash_password_async(password)
+    except PasswordHasherBusy:
+        return  # the next login tries again
+    async with AsyncSession(bind, expire_on_commit=False) as session:
+        user = await session.get(User, user_id)
+        # skip if the password changed while we were hashing
+        if user and user.hashed_password == old_hash:
+            user.hashed_password = new_hash
+            session.add(user)
+            await session.commit()
+
+
 @router.post("/login")
-def login(data: LoginRequest, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.email == data.email)).first()
-    if not user or not verify_password(data.password, user.hashed_password):
+async def login(
+    data: LoginRequest,
+    background_tasks: BackgroundTasks,
+    session: AsyncSession = Depends(get_async_session),
+):
+    user = (await session.exec(
+        select(User)
+        .where(User.email == data.email)
+        .options(selectinload(User.student_profile), selectinload(User.teacher_profile))
+    )).first()
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    token = create_access_token({"sub": str(user.id), "role": user.role})
+    try:
+        valid = await verify_password_async(data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if needs_rehash(user.hashed_password):
+        background_tasks.add_task(_rehash_password, session.bind, user.id, user.hashed_password, data.password)
+    token = create_access_token(
+        {"sub": str(user.id), "role": user.role, "email": user.email, "ver": user.token_version},
+        expires_delta=access_token_lifetime(),
+    )
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -68,7 +148,11 @@ def login(data: LoginRequest, session: Session = Depends(get_session)):
 # ----------------------
 
 @router.get("/me")
-def read_profile(user: User = Depends(get_current_user)):
+def read_profile(principal: UserPrincipal = Depends(get_current_user), session: Session = Depends(get_session)):
+    # the auth dependency only yields a cached principal; profiles need the full row
+    user = session.get(User, principal.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
     return {
         "email": user.email,
         "role": user.role,
@@ -109,8 +193,10 @@ def admin_reset_password(
         raise HTTPException(status_code=404, detail="User not found")
 
     user.hashed_password = hash_password(data.new_password)
+    user.token_version += 1  # tokens issued with the old password stop working
     session.add(user)
     session.commit()
+    invalidate_principal(user.id)
 
     return {"message": f"Password for {user.email} has been reset successfully"}
 
@@ -127,5 +213,97 @@ def delete_user_by_id(
 
     session.delete(user)
     session.commit()
+    invalidate_principal(user_id)
 
     return {"message": f"User with ID {user_id} deleted successfully"}
+
+
+# ----------------------
+# Bulk Provisioning (Admin)
+# ----------------------
+
+def _register_users_bulk(rows: list[dict], session: Session) -> BulkRegisterResponse:
+    """Validate rows, skip conflicting emails, then hash in parallel and insert in one transaction"""
+    results: list[BulkRegisterRowResult] = []
+    accepted: list[tuple[BulkRegisterRowResult, RegisterRequest]] = []
+    seen: set[str] = set()
+
+    emails = [row.get("email") for row in rows if isinstance(row.get("email"), str)]
+    registered = set(session.exec(select(User.email).where(User.email.in_(emails))).all()) if emails else set()
+
+    for index, row in enumerate(rows, start=1):
+        try:
+            data = RegisterRequest.model_validate(row)
+        except ValidationError as e:
+            results.append(BulkRegisterRowResult(
+                row=index, email=row["email"] if isinstance(row.get("email"), str) else None, status="invalid",
+                detail="; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+            ))
+            continue
+        if not data.email or not data.password:
+            results.append(BulkRegisterRowResult(row=index, email=data.email, status="invalid",
+                                                 detail="email and password are required"))
+        elif data.role not in ROLE_LEVEL:
+            results.append(BulkRegisterRowResult(row=index, email=data.email, status="invalid",
+                                                 detail=f"unknown role '{data.role}'"))
+        elif data.email in registered:
+            results.append(BulkRegisterRowResult(row=index, email=data.email, status="conflict",
+                                                 detail="Email already registered"))
+        elif data.email in seen:
+            results.append(BulkRegisterRowResult(row=index, email=data.email, status="conflict",
+                                                 detail="Email repeated in this batch"))
+        else:
+            seen.add(data.email)
+            result = BulkRegisterRowResult(row=index, email=data.email, status="created", id=uuid4())
+            results.append(result)
+            accepted.append((result, data))
+
+    if accepted:
+        hashed = hash_passwords([data.password for _, data in accepted])
+        try:
+            session.exec(insert(User), params=[
+                {"id": result.id, "email": data.email, "hashed_password": password_hash, "role": data.role}
+                for (result, data), password_hash in zip(accepted, hashed)
+            ])
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise HTTPException(status_code=409, detail="Some emails were registered while the batch ran, please resubmit")
+
+    return BulkRegisterResponse(
+        created=sum(r.status == "created" for r in results),
+        conflicts=sum(r.status == "conflict" for r in results),
+        invalid=sum(r.status == "invalid" for r in results),
+        results=results,
+    )
+
+
+@router.post("/admin/register-bulk", response_model=BulkRegisterResponse)
+def register_users_bulk(
+    rows: List[dict],
+    session: Session = Depends(get_session),
+    _: User = Depends(require_min_role("admin")),
+):
+    """Create many accounts from a JSON array of {email, password, role}"""
+    return _register_users_bulk(rows, session)
+
+
+@router.post("/admin/register-bulk/csv", response_model=BulkRegisterResponse)
+def register_users_bulk_csv(
+    file: UploadFile = File(..., description="CSV with an email,password,role header"),
+    session: Session = Depends(get_session),
+    _: User = Depends(require_min_role("admin")),
+):
+    """Create many accounts from a CSV upload"""
+    try:
+        text = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    rows = [
+        {key.strip(): (value.strip() if isinstance(value, str) else value) for key, value in row.items() if key}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+    for row in rows:
+        if not row.get("role"):
+            row.pop("role", None)  # blank role falls back to the default, as in /register
+    return _register_users_bulk(rows, session)
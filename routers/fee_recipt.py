@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Path
 from sqlmodel import select
 from typing import List
 from uuid import UUID
 
 from models.fee_receipt import FeeReceipt, FeeReceiptCreate, FeeReceiptRead
+from models.users import UserPrincipal
 from database import SessionDep
-from Utilities.auth import require_min_role
+from Utilities.auth import require_min_role, get_token_principal
+from Utilities.idempotency import IdempotentRequest
 
 router = APIRouter(
     prefix="/fee-receipts",
@@ -15,13 +17,24 @@ router = APIRouter(
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=FeeReceiptRead)
 def create_fee_receipt(
-    receipt_data: FeeReceiptCreate, session: SessionDep
+    receipt_data: FeeReceiptCreate,
+    session: SessionDep,
+    user: UserPrincipal = Depends(get_token_principal),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
+    request = IdempotentRequest(
+        session, user.id, "POST /fee-receipts/", idempotency_key, receipt_data.model_dump_json(exclude_unset=True)
+    )
+    if (replay := request.replay()) is not None:
+        return replay
+
     new_receipt = FeeReceipt(**receipt_data.model_dump())  # ✅ Replaces from_orm
     session.add(new_receipt)
-    session.commit()
-    session.refresh(new_receipt)
-    return new_receipt
+    result = FeeReceiptRead(**new_receipt.model_dump())
+    request.remember(status.HTTP_201_CREATED, result.model_dump_json())
+    if (replay := request.commit()) is not None:
+        return replay
+    return result
 
 @router.get("/", response_model=List[FeeReceiptRead])
 def get_all_fee_receipts(
@@ -15,7 +15,7 @@ from models.notifications import (
     is_predefined_recipient_type,
     is_class_name
 )
-from database import SessionDep
+from database import SessionDep, AsyncSessionDep
 import firebase_admin 
 from firebase_admin import credentials, messaging
 
@@ -100,30 +100,30 @@ def create_notification(
 
 # Get notifications by recipient_type
 @router.get("/by-type/{recipient_type}", response_model=List[NotificationRead])
-def get_notifications_by_recipient_type(
+async def get_notifications_by_recipient_type(
     recipient_type: str,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
     """Get all notifications for a specific recipient type (e.g., 'global', 'student', 'teacher', 'class_name')"""
     query = select(Notification).where(
         Notification.recipient_type == recipient_type
     )
     
-    notifications = session.exec(query).all()
+    notifications = (await session.exec(query)).all()
     return notifications
 
 # Get notifications by recipient_id
 @router.get("/by-id/{recipient_id}", response_model=List[NotificationRead])
-def get_notifications_by_recipient_id(
+async def get_notifications_by_recipient_id(
     recipient_id: UUID,
-    session: SessionDep,
+    session: AsyncSessionDep,
 ):
     """Get all notifications for a specific recipient ID"""
     query = select(Notification).where(
         Notification.recipient_id == recipient_id
     )
     
-    notifications = session.exec(query).all()
+    notifications = (await session.exec(query)).all()
     return notifications
 
 # Get all notifications (for admin purposes)
@@ -0,0 +1,83 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlmodel import SQLModel, create_engine, Session
+from main import app
+from database import get_session, PoolMetrics
+
+from models.users import User
+from Utilities.security import hash_password
+
+DATABASE_URL = "sqlite:///./test.db"
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+def override_get_session():
+    with Session(engine) as session:
+        yield session
+
+app.dependency_overrides[get_session] = override_get_session
+
+@pytest.fixture(scope="module", autouse=True)
+def setup_db():
+    SQLModel.metadata.create_all(engine)
+    yield
+
+
+def test_pool_metrics_snapshot():
+    metrics = PoolMetrics()
+    metrics.record_checkout(0.002)
+    metrics.record_checkout(0.004)
+    metrics.record_timeout(0.030)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["max_wait_ms"] == 30.0
+    assert snapshot["avg_wait_ms"] == 12.0
+
+
+@pytest.mark.asyncio
+async def test_db_pool_status_requires_admin():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "pool_student@example.com",
+            "password": "studentpass",
+            "role": "student"
+        })
+        res = await client.post("/login", json={
+            "email": "pool_student@example.com",
+            "password": "studentpass"
+        })
+        student_token = res.json()["access_token"]
+
+        with Session(engine) as session:
+            session.add(User(
+                email="pool_admin@example.com",
+                hashed_password=hash_password("adminpass"),
+                role="admin"
+            ))
+            session.commit()
+
+        res = await client.post("/login", json={
+            "email": "pool_admin@example.com",
+            "password": "adminpass"
+        })
+        admin_token = res.json()["access_token"]
+
+        res = await client.get("/admin/db-pool", headers={"Authorization": f"Bearer {student_token}"})
+        assert res.status_code == 403
+
+        res = await client.get("/admin/db-pool", headers={"Authorization": f"Bearer {admin_token}"})
+        assert res.status_code == 200
+        data = res.json()
+        for engine_name in ("sync", "async"):
+            for key in ("pool_size", "max_overflow", "checked_out", "idle", "overflow_in_use",
+                        "checkouts", "avg_wait_ms", "max_wait_ms"):
+                assert key in data[engine_name]
+
+        res = await client.get("/admin/auth-cache", headers={"Authorization": f"Bearer {admin_token}"})
+        assert res.status_code == 200
+        stats = res.json()
+        assert stats["principals"]["hits"] >= 1
+        assert stats["tokens"]["hits"] >= 1
+        assert {"misses", "hit_ratio", "size", "maxsize"} <= stats["tokens"].keys()
@@ -1,8 +1,11 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from main import app
-from database import get_session
+from database import get_session, get_async_session
 from Utilities.security import hash_password
 from uuid import UUID
 from datetime import date
@@ -16,6 +19,7 @@ from models.attendance import AttendanceSession, AttendanceRecord
 # Setup test DB
 DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
 
 def override_get_session():
     with Session(engine) as session:
@@ -23,6 +27,12 @@ def override_get_session():
 
 app.dependency_overrides[get_session] = override_get_session
 
+async def override_get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+app.dependency_overrides[get_async_session] = override_get_async_session
+
 @pytest.fixture(scope="module", autouse=True)
 def setup_db():
     SQLModel.metadata.create_all(engine)
@@ -115,3 +125,1190 @@ async def test_attendance_crud_flow():
         res = await client.delete(f"/attendance/session/{session_id}/",
                                   headers={"Authorization": f"Bearer {teacher_token}"})
         assert res.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_create_attendance_session_uses_one_batched_insert():
+    from uuid import uuid4
+    from sqlalchemy import event
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_bulk@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_bulk@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        payload = {
+            "date": "2025-07-17",
+            "teacher_id": str(uuid4()),
+            "subject": "Science",
+            "class_name": "10A",
+            "records": [
+                {"student_id": str(uuid4()), "status": "present", "student_name": f"Student {i}"}
+                for i in range(60)
+            ]
+        }
+
+        # other test modules install their own override; make sure this engine serves the request
+        app.dependency_overrides[get_session] = override_get_session
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            res = await client.post("/attendance/", json=payload, headers=headers)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert res.status_code == 201
+        assert len(res.json()["records"]) == 60
+        record_inserts = [s for s in statements if s.startswith("INSERT INTO attendancerecord")]
+        assert len(record_inserts) == 1
+        # the only read is the single batched lookup of student names
+        selects = [s for s in statements if s.startswith("SELECT")]
+        assert len(selects) == 1 and selects[0].startswith("SELECT students.id, students.name")
+
+
+def _query_plan(statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def test_attendance_hot_queries_use_composite_indexes():
+    from uuid import uuid4
+
+    student_id, session_id = uuid4(), uuid4()
+
+    calendar = (
+        select(AttendanceRecord, AttendanceSession)
+        .join(AttendanceSession, AttendanceRecord.session_id == AttendanceSession.id)
+        .where(
+            AttendanceRecord.student_id == student_id,
+            AttendanceSession.date >= date(2025, 7, 1),
+            AttendanceSession.date < date(2025, 8, 1),
+        )
+    )
+    plan = _query_plan(calendar)
+    assert "ix_attendancerecord_student_id_session_id" in plan
+    assert "SCAN attendancerecord" not in plan
+
+    student_history = select(AttendanceRecord).where(AttendanceRecord.student_id == student_id)
+    assert "ix_attendancerecord_student_id_session_id" in _query_plan(student_history)
+
+    one_record = select(AttendanceRecord).where(
+        AttendanceRecord.session_id == session_id,
+        AttendanceRecord.student_id == student_id,
+    )
+    # either composite index answers an equality lookup on both columns; SQLite may pick either
+    plan = _query_plan(one_record)
+    assert any(
+        name in plan
+        for name in ("uq_attendancerecord_session_id_student_id", "ix_attendancerecord_student_id_session_id")
+    )
+    assert "SCAN attendancerecord" not in plan
+
+    sessions_by_day = select(AttendanceSession).where(AttendanceSession.date == date(2025, 7, 16))
+    assert "ix_attendancesession_date_class_name" in _query_plan(sessions_by_day)
+
+    sessions_by_teacher = select(AttendanceSession).where(AttendanceSession.teacher_id == uuid4())
+    assert "ix_attendancesession_teacher_id_date" in _query_plan(sessions_by_teacher)
+
+
+@pytest.mark.asyncio
+async def test_patch_attendance_upserts_a_list_of_records():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_upsert@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_upsert@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        marked, late_comer, new_student = uuid4(), uuid4(), uuid4()
+        res = await client.post("/attendance/", json={
+            "date": "2025-07-18",
+            "teacher_id": str(uuid4()),
+            "subject": "History",
+            "class_name": "10A",
+            "records": [
+                {"student_id": str(marked), "status": "present", "student_name": "Marked"},
+                {"student_id": str(late_comer), "status": "absent", "student_name": "Late Comer"},
+            ]
+        }, headers=headers)
+        session_id = res.json()["id"]
+        original_ids = {r["student_id"]: r["id"] for r in res.json()["records"]}
+
+        res = await client.patch(f"/attendance/session/{session_id}/update", json=[
+            {"student_id": str(late_comer), "status": "present"},
+            {"student_id": str(new_student), "status": "absent", "student_name": "New"},
+            {"student_id": str(new_student), "status": "present"},
+        ], headers=headers)
+        assert res.status_code == 200
+        saved = {r["student_id"]: r for r in res.json()}
+        assert saved[str(late_comer)]["status"] == "present"
+        assert saved[str(late_comer)]["id"] == original_ids[str(late_comer)]
+        assert saved[str(late_comer)]["student_name"] == "Late Comer"
+        assert saved[str(new_student)]["status"] == "present"
+
+        res = await client.get(f"/attendance/session/{session_id}/", headers=headers)
+        records = res.json()["records"]
+        assert len(records) == 3
+        assert len({r["student_id"] for r in records}) == 3
+
+        res = await client.patch(f"/attendance/session/{uuid4()}/update",
+                                 json={"student_id": str(marked), "status": "absent"}, headers=headers)
+        assert res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_put_attendance_session_applies_only_the_difference():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_diff@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_diff@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        unchanged, corrected, dropped, added = uuid4(), uuid4(), uuid4(), uuid4()
+        sheet = {
+            "date": "2025-07-19",
+            "teacher_id": str(uuid4()),
+            "subject": "Art",
+            "class_name": "10A",
+        }
+        res = await client.post("/attendance/", json={**sheet, "records": [
+            {"student_id": str(unchanged), "status": "present", "student_name": "Same"},
+            {"student_id": str(corrected), "status": "absent", "student_name": "Fixed"},
+            {"student_id": str(dropped), "status": "present", "student_name": "Gone"},
+        ]}, headers=headers)
+        session_id = res.json()["id"]
+        original_ids = {r["student_id"]: r["id"] for r in res.json()["records"]}
+
+        res = await client.put(f"/attendance/session/{session_id}/", json={**sheet, "records": [
+            {"student_id": str(unchanged), "status": "present", "student_name": "Same"},
+            {"student_id": str(corrected), "status": "present", "student_name": "Fixed"},
+            {"student_id": str(added), "status": "absent", "student_name": "New"},
+        ]}, headers=headers)
+        assert res.status_code == 200
+        returned = {r["student_id"]: r for r in res.json()["records"]}
+        assert set(returned) == {str(unchanged), str(corrected), str(added)}
+        assert returned[str(unchanged)]["id"] == original_ids[str(unchanged)]
+        assert returned[str(corrected)]["id"] == original_ids[str(corrected)]
+        assert returned[str(corrected)]["status"] == "present"
+
+        res = await client.get(f"/attendance/session/{session_id}/", headers=headers)
+        stored = {r["student_id"]: r for r in res.json()["records"]}
+        assert stored == returned
+
+
+@pytest.mark.asyncio
+async def test_admin_deletes_sessions_by_date_range():
+    from uuid import uuid4
+
+    with Session(engine) as session:
+        session.add(User(
+            email="cleanup_admin@attend.com",
+            hashed_password=hash_password("adminpass"),
+            role="admin"
+        ))
+        session.commit()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "cleanup_teacher@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "cleanup_teacher@attend.com",
+            "password": "teacherpass"
+        })
+        teacher_headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        res = await client.post("/login", json={
+            "email": "cleanup_admin@attend.com",
+            "password": "adminpass"
+        })
+        admin_headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        session_ids = []
+        for day in ("2031-01-10", "2031-01-20", "2031-02-05"):
+            res = await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": str(uuid4()),
+                "subject": "History",
+                "class_name": "CLEANUP",
+                "records": [
+                    {"student_id": str(uuid4()), "status": "present"},
+                    {"student_id": str(uuid4()), "status": "absent"},
+                ],
+            }, headers=teacher_headers)
+            session_ids.append(res.json()["id"])
+
+        params = {"start_date": "2031-01-01", "end_date": "2031-01-31", "class_name": "CLEANUP"}
+        res = await client.delete("/attendance/sessions/", params=params, headers=teacher_headers)
+        assert res.status_code == 403
+
+        res = await client.delete("/attendance/sessions/", params=params, headers=admin_headers)
+        assert res.status_code == 200
+        assert res.json() == {"deleted_sessions": 2, "deleted_records": 4}
+
+        for session_id in session_ids[:2]:
+            res = await client.get(f"/attendance/session/{session_id}/", headers=teacher_headers)
+            assert res.status_code == 404
+        res = await client.get(f"/attendance/session/{session_ids[2]}/", headers=teacher_headers)
+        assert res.status_code == 200
+        assert len(res.json()["records"]) == 2
+
+        res = await client.delete(f"/attendance/session/{session_ids[0]}/", headers=teacher_headers)
+        assert res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_filter_records_by_class_joins_through_classroom():
+    from uuid import uuid4
+    from models.classroom import Classroom
+
+    with Session(engine) as session:
+        classroom = Classroom(name="FILTER-7B")
+        other = Classroom(name="FILTER-7C")
+        session.add_all([classroom, other])
+        session.flush()
+        ours = [Student(name=f"Pupil {i}", class_id=classroom.id) for i in range(2)]
+        theirs = Student(name="Elsewhere", class_id=other.id)
+        session.add_all([*ours, theirs])
+        session.commit()
+        our_ids = {str(s.id) for s in ours}
+        their_id = str(theirs.id)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_filter@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_filter@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        for day in ("2032-03-01", "2032-03-02"):
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": str(uuid4()),
+                "subject": "Maths",
+                "class_name": "FILTER-7B",
+                "records": [
+                    *({"student_id": sid, "status": "present"} for sid in our_ids),
+                    {"student_id": their_id, "status": "absent"},
+                ],
+            }, headers=headers)
+
+        res = await client.get("/attendance/records/filter/",
+                               params={"class_name": "FILTER-7B", "limit": 3}, headers=headers)
+        assert res.status_code == 200
+        first_page = res.json()
+        assert len(first_page) == 3
+        assert {r["student_id"] for r in first_page} <= our_ids
+
+        res = await client.get("/attendance/records/filter/",
+                               params={"class_name": "FILTER-7B", "limit": 3, "page": 2}, headers=headers)
+        second_page = res.json()
+        assert len(second_page) == 1
+        assert not {r["id"] for r in first_page} & {r["id"] for r in second_page}
+
+        res = await client.get("/attendance/records/filter/",
+                               params={"class_name": "FILTER-7B", "date": "2032-03-01"}, headers=headers)
+        assert len(res.json()) == 2
+
+        res = await client.get("/attendance/records/filter/",
+                               params={"class_name": "NO-SUCH-CLASS"}, headers=headers)
+        assert res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_class_matrix_encodes_a_month_per_student():
+    from uuid import uuid4
+    from models.classroom import Classroom
+
+    with Session(engine) as session:
+        classroom = Classroom(name="MATRIX-3A")
+        session.add(classroom)
+        session.flush()
+        first = Student(name="Asha", roll_number=1, class_id=classroom.id)
+        second = Student(name="Bela", roll_number=2, class_id=classroom.id)
+        idle = Student(name="Chand", roll_number=3, class_id=classroom.id)
+        session.add_all([first, second, idle])
+        session.commit()
+        first_id, second_id, idle_id = str(first.id), str(second.id), str(idle.id)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_matrix@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_matrix@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        sheets = [
+            ("2033-02-01", "Maths", {first_id: "present", second_id: "absent"}),
+            ("2033-02-01", "Art", {first_id: "late", second_id: "present"}),
+            ("2033-02-28", "Maths", {first_id: "present"}),
+            ("2033-03-01", "Maths", {first_id: "absent"}),  # next month, not in the matrix
+        ]
+        for day, subject, marks in sheets:
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": str(uuid4()),
+                "subject": subject,
+                "class_name": "MATRIX-3A",
+                "records": [{"student_id": sid, "status": st} for sid, st in marks.items()],
+            }, headers=headers)
+
+        res = await client.get("/attendance/class/MATRIX-3A/matrix/", params={"month": "2033-02"}, headers=headers)
+        assert res.status_code == 200
+        body = res.json()
+        assert body["month"] == "2033-02"
+        rows = {row["student_id"]: row["days"] for row in body["students"]}
+        assert [row["name"] for row in body["students"]] == ["Asha", "Bela", "Chand"]
+        assert rows[first_id] == "L" + "-" * 26 + "P"
+        assert rows[second_id] == "A" + "-" * 27
+        assert rows[idle_id] == "-" * 28
+
+        await client.post("/register", json={
+            "email": "student_matrix@attend.com",
+            "password": "studentpass",
+            "role": "student"
+        })
+        res = await client.post("/login", json={
+            "email": "student_matrix@attend.com",
+            "password": "studentpass"
+        })
+        res = await client.get("/attendance/class/MATRIX-3A/matrix/", params={"month": "2033-02"},
+                               headers={"Authorization": f"Bearer {res.json()['access_token']}"})
+        assert res.status_code == 403
+
+        res = await client.get("/attendance/class/NO-SUCH/matrix/", params={"month": "2033-02"}, headers=headers)
+        assert res.status_code == 404
+        res = await client.get("/attendance/class/MATRIX-3A/matrix/", params={"month": "Feb"}, headers=headers)
+        assert res.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_attendance_stats_are_aggregated_and_cached():
+    from uuid import uuid4
+    from routers.attendance import attendance_stats_cache
+
+    attendance_stats_cache.clear()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for role in ("teacher", "student"):
+            await client.post("/register", json={
+                "email": f"{role}_stats@attend.com",
+                "password": "statspass",
+                "role": role
+            })
+        tokens = {}
+        for role in ("teacher", "student"):
+            res = await client.post("/login", json={"email": f"{role}_stats@attend.com", "password": "statspass"})
+            tokens[role] = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        headers = tokens["teacher"]
+
+        pupil = str(uuid4())
+        for day, subject, statuses in [
+            ("2034-05-02", "Biology", ["present", "present", "absent", "late"]),
+            ("2034-05-03", "Biology", ["absent", "absent"]),
+            ("2034-05-03", "Chemistry", ["present"]),
+        ]:
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": str(uuid4()),
+                "subject": subject,
+                "class_name": "STATS-9",
+                "records": [
+                    {"student_id": pupil if i == 0 else str(uuid4()), "status": st}
+                    for i, st in enumerate(statuses)
+                ],
+            }, headers=headers)
+
+        params = {"start_date": "2034-05-01", "end_date": "2034-05-31"}
+        res = await client.get("/attendance/stats/subject/", params=params, headers=tokens["student"])
+        assert res.status_code == 403
+
+        res = await client.get("/attendance/stats/subject/", params=params, headers=headers)
+        assert res.status_code == 200
+        assert "max-age" in res.headers["cache-control"]
+        body = res.json()
+        assert body["total"] == 2
+        biology, chemistry = body["items"]
+        assert (biology["key"], biology["total"], biology["present"], biology["late"], biology["absent"]) == \
+            ("Biology", 6, 2, 1, 3)
+        assert biology["attendance_percentage"] == 50.0
+        assert chemistry["attendance_percentage"] == 100.0
+
+        res = await client.get("/attendance/stats/student/", params={**params, "limit": 1}, headers=headers)
+        assert res.json()["total"] == 5  # the pupil appears in all three sessions
+        assert len(res.json()["items"]) == 1
+
+        res = await client.get("/attendance/stats/class/", params={"start_date": "2034-05-03", "end_date": "2034-05-03"},
+                               headers=headers)
+        assert res.json()["items"] == [{
+            "key": "STATS-9", "total": 3, "present": 1, "late": 0, "absent": 2, "attendance_percentage": 33.33,
+        }]
+
+        hits = attendance_stats_cache.hits
+        await client.get("/attendance/stats/subject/", params=params, headers=headers)
+        assert attendance_stats_cache.hits == hits + 1
+
+        res = await client.get("/attendance/stats/weekday/", headers=headers)
+        assert res.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_daily_summary_follows_every_write():
+    from uuid import uuid4
+    from models.attendance import AttendanceDailySummary
+    from Utilities.attendance_summary import rebuild_daily_summary
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_summary@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_summary@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        async def summary():
+            res = await client.get("/attendance/summary/", params={"class_name": "SUMMARY-4"}, headers=headers)
+            return [(r["date"], r["subject"], r["present"], r["absent"], r["late"], r["total"]) for r in res.json()]
+
+        a, b, c = (str(uuid4()) for _ in range(3))
+        sheet = {"date": "2035-09-01", "teacher_id": str(uuid4()), "subject": "Music", "class_name": "SUMMARY-4"}
+        res = await client.post("/attendance/", json={**sheet, "records": [
+            {"student_id": a, "status": "present"},
+            {"student_id": b, "status": "absent"},
+        ]}, headers=headers)
+        session_id = res.json()["id"]
+        await client.post("/attendance/", json={**sheet, "teacher_id": str(uuid4()), "records": [
+            {"student_id": c, "status": "late"},
+        ]}, headers=headers)
+        assert await summary() == [("2035-09-01", "Music", 1, 1, 1, 3)]
+
+        await client.patch(f"/attendance/session/{session_id}/update",
+                           json={"student_id": b, "status": "present"}, headers=headers)
+        assert await summary() == [("2035-09-01", "Music", 2, 0, 1, 3)]
+
+        await client.put(f"/attendance/session/{session_id}/", json={**sheet, "records": [
+            {"student_id": a, "status": "absent"},
+        ]}, headers=headers)
+        assert await summary() == [("2035-09-01", "Music", 0, 1, 1, 2)]
+
+        await client.delete(f"/attendance/session/{session_id}/student/{a}/", headers=headers)
+        assert await summary() == [("2035-09-01", "Music", 0, 0, 1, 1)]
+
+        await client.delete(f"/attendance/session/{session_id}/", headers=headers)
+        assert await summary() == [("2035-09-01", "Music", 0, 0, 1, 1)]
+
+    with Session(engine) as session:
+        row = session.get(AttendanceDailySummary, (date(2035, 9, 1), "SUMMARY-4", "Music"))
+        row.late = 7
+        session.commit()
+        rebuild_daily_summary(session)
+        session.commit()
+        assert rebuild_daily_summary(session, check=True) == []
+        assert session.get(AttendanceDailySummary, (date(2035, 9, 1), "SUMMARY-4", "Music")).late == 1
+
+
+@pytest.mark.asyncio
+async def test_status_is_stored_as_code_and_names_come_from_students():
+    from uuid import uuid4
+
+    with Session(engine) as session:
+        known = Student(name="Registered Pupil")
+        session.add(known)
+        session.commit()
+        known_id = str(known.id)
+    unknown_id = str(uuid4())
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_codes@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_codes@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        sheet = {"date": "2036-01-05", "teacher_id": str(uuid4()), "subject": "PE", "class_name": "CODES-1"}
+        res = await client.post("/attendance/", json={**sheet, "records": [
+            {"student_id": known_id, "status": "sick"},
+        ]}, headers=headers)
+        assert res.status_code == 422
+
+        res = await client.post("/attendance/", json={**sheet, "records": [
+            {"student_id": known_id, "status": "late", "student_name": "Typed By Teacher"},
+            {"student_id": unknown_id, "status": "absent", "student_name": "Walk-in"},
+        ]}, headers=headers)
+        assert res.status_code == 201
+        session_id = res.json()["id"]
+        names = {r["student_id"]: r["student_name"] for r in res.json()["records"]}
+        assert names == {known_id: "Registered Pupil", unknown_id: "Walk-in"}
+
+        res = await client.get(f"/attendance/session/{session_id}/", headers=headers)
+        read_back = {r["student_id"]: (r["status"], r["student_name"]) for r in res.json()["records"]}
+        assert read_back == {known_id: ("late", "Registered Pupil"), unknown_id: ("absent", "Walk-in")}
+
+    with engine.connect() as conn:
+        stored = dict(conn.exec_driver_sql(
+            "SELECT status, student_name FROM attendancerecord WHERE session_id = ?",
+            (UUID(session_id).hex,),
+        ).all())
+    assert stored == {3: None, 2: "Walk-in"}
+
+
+@pytest.mark.asyncio
+async def test_attendance_retry_with_idempotency_key_replays_the_first_response():
+    from datetime import datetime, timedelta
+    from uuid import uuid4
+    from models.idempotency import IdempotencyKey
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_retry@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_retry@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}", "Idempotency-Key": "sheet-2037-03-02"}
+
+        payload = {
+            "date": "2037-03-02",
+            "teacher_id": str(uuid4()),
+            "subject": "Geography",
+            "class_name": "RETRY-6",
+            "records": [{"student_id": str(uuid4()), "status": "present"}],
+        }
+        first = await client.post("/attendance/", json=payload, headers=headers)
+        retry = await client.post("/attendance/", json=payload, headers=headers)
+        assert first.status_code == retry.status_code == 201
+        assert retry.json()["id"] == first.json()["id"]
+
+        with Session(engine) as session:
+            sessions = session.exec(select(AttendanceSession).where(AttendanceSession.class_name == "RETRY-6")).all()
+            assert len(sessions) == 1
+
+            # once the key has expired the same request is a new write
+            key = session.exec(select(IdempotencyKey).where(IdempotencyKey.key == "sheet-2037-03-02")).one()
+            key.expires_at = datetime.utcnow() - timedelta(seconds=1)
+            session.commit()
+
+        res = await client.post("/attendance/", json=payload, headers=headers)
+        assert res.status_code == 201
+        assert res.json()["id"] != first.json()["id"]
+        assert "idempotent-replayed" not in res.headers
+
+
+@pytest.mark.asyncio
+async def test_compact_submission_expands_against_the_roster():
+    from uuid import uuid4
+    from models.classroom import Classroom
+
+    with Session(engine) as session:
+        classroom = Classroom(name="COMPACT-8")
+        session.add(classroom)
+        session.flush()
+        pupils = [Student(name=f"Roster {i:02d}", roll_number=i, class_id=classroom.id) for i in range(30)]
+        session.add_all(pupils)
+        session.commit()
+        pupil_ids = [str(p.id) for p in pupils]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_compact@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_compact@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        sheet = {"date": "2038-04-04", "teacher_id": str(uuid4()), "subject": "Hindi", "class_name": "COMPACT-8"}
+        res = await client.post("/attendance/compact", json={**sheet, "exceptions": [
+            {"student_id": pupil_ids[3], "status": "absent"},
+            {"student_id": pupil_ids[7], "status": "late"},
+        ]}, headers=headers)
+        assert res.status_code == 201
+        records = res.json()["records"]
+        assert [r["student_id"] for r in records] == pupil_ids
+        statuses = {r["student_id"]: r["status"] for r in records}
+        assert statuses.pop(pupil_ids[3]) == "absent"
+        assert statuses.pop(pupil_ids[7]) == "late"
+        assert set(statuses.values()) == {"present"}
+        assert records[0]["student_name"] == "Roster 00"
+
+        res = await client.get(f"/attendance/session/{res.json()['id']}/", headers=headers)
+        assert len(res.json()["records"]) == 30
+
+        res = await client.post("/attendance/compact", json={**sheet, "exceptions": [
+            {"student_id": str(uuid4()), "status": "absent"},
+        ]}, headers=headers)
+        assert res.status_code == 400
+        res = await client.post("/attendance/compact", json={**sheet, "class_name": "NO-SUCH"}, headers=headers)
+        assert res.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_is_one_transaction_and_safe_to_replay():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_batch@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_batch@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        teacher_id, twice = str(uuid4()), str(uuid4())
+        offline = [
+            {
+                "client_key": f"device-1/{day}",
+                "date": day,
+                "teacher_id": teacher_id,
+                "subject": "Sanskrit",
+                "class_name": "BATCH-5",
+                "records": [
+                    {"student_id": str(uuid4()), "status": "present"},
+                    {"student_id": str(uuid4()), "status": "absent"},
+                ],
+            }
+            for day in ("2039-06-01", "2039-06-02", "2039-06-03")
+        ]
+        broken = {**offline[0], "client_key": "device-1/broken", "records": [
+            {"student_id": twice, "status": "present"},
+            {"student_id": twice, "status": "absent"},
+        ]}
+
+        res = await client.post("/attendance/batch", json={"sessions": [*offline, broken]}, headers=headers)
+        assert res.status_code == 200
+        body = res.json()
+        assert (body["created"], body["duplicates"], body["invalid"]) == (3, 0, 1)
+        created = {r["client_key"]: r["session_id"] for r in body["results"] if r["status"] == "created"}
+
+        # connection dropped before the client saw the answer: it uploads everything again
+        res = await client.post("/attendance/batch", json={"sessions": offline}, headers=headers)
+        body = res.json()
+        assert (body["created"], body["duplicates"]) == (0, 3)
+        assert {r["client_key"]: r["session_id"] for r in body["results"]} == created
+
+        with Session(engine) as session:
+            stored = session.exec(select(AttendanceSession).where(AttendanceSession.class_name == "BATCH-5")).all()
+            assert len(stored) == 3
+            records = session.exec(
+                select(AttendanceRecord).where(AttendanceRecord.session_id.in_([s.id for s in stored]))
+            ).all()
+            assert len(records) == 6
+
+
+@pytest.mark.asyncio
+async def test_export_streams_joined_rows_as_csv_and_ndjson():
+    import csv
+    import io
+    import json
+    from uuid import uuid4
+
+    with Session(engine) as session:
+        session.add(User(
+            email="export_admin@attend.com",
+            hashed_password=hash_password("adminpass"),
+            role="admin"
+        ))
+        session.commit()
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post("/login", json={"email": "export_admin@attend.com", "password": "adminpass"})
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        pupils = [str(uuid4()) for _ in range(3)]
+        for day in ("2040-02-10", "2040-02-11"):
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": str(uuid4()),
+                "subject": "Physics",
+                "class_name": "EXPORT-12",
+                "records": [
+                    {"student_id": sid, "status": "absent" if i == 0 else "present", "student_name": f"Kid {i}"}
+                    for i, sid in enumerate(pupils)
+                ],
+            }, headers=headers)
+
+        params = {"start_date": "2040-02-01", "end_date": "2040-02-29", "class_name": "EXPORT-12"}
+        res = await client.get("/attendance/export/", params=params, headers=headers)
+        assert res.status_code == 200
+        assert res.headers["content-type"].startswith("text/csv")
+        assert 'filename="attendance_2040-02-01_2040-02-29.csv"' in res.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(res.text)))
+        assert len(rows) == 6
+        assert [row["date"] for row in rows] == ["2040-02-10"] * 3 + ["2040-02-11"] * 3
+        assert sorted(row["status"] for row in rows if row["student_id"] == pupils[0]) == ["absent", "absent"]
+        assert {row["student_name"] for row in rows} == {"Kid 0", "Kid 1", "Kid 2"}
+
+        res = await client.get("/attendance/export/", params={**params, "format": "ndjson"}, headers=headers)
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert len(lines) == 6
+        assert {line["class_name"] for line in lines} == {"EXPORT-12"}
+        assert lines[0].keys() == {
+            "session_id", "date", "class_name", "subject", "teacher_id",
+            "record_id", "student_id", "student_name", "status",
+        }
+
+        await client.post("/register", json={
+            "email": "export_teacher@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={"email": "export_teacher@attend.com", "password": "teacherpass"})
+        res = await client.get("/attendance/export/", params=params,
+                               headers={"Authorization": f"Bearer {res.json()['access_token']}"})
+        assert res.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_calendar_is_cached_with_etag_and_invalidated_by_writes():
+    from uuid import uuid4
+    from routers.attendance import calendar_cache
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_etag@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_etag@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        student_id = str(uuid4())
+        res = await client.post("/attendance/", json={
+            "date": "2024-11-12",
+            "teacher_id": str(uuid4()),
+            "subject": "Civics",
+            "class_name": "ETAG-2",
+            "records": [{"student_id": student_id, "status": "present"}],
+        }, headers=headers)
+        session_id = res.json()["id"]
+        url = f"/attendance/student/{student_id}/calendar/?month=2024-11"
+
+        first = await client.get(url, headers=headers)
+        assert first.status_code == 200
+        assert first.json()[0]["status"] == "present"
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"].startswith("private, max-age=")  # a closed month
+
+        hits = calendar_cache.hits
+        res = await client.get(url, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 304
+        assert res.headers["etag"] == etag
+        assert res.content == b""
+        assert calendar_cache.hits == hits + 1
+
+        await client.patch(f"/attendance/session/{session_id}/update",
+                           json={"student_id": student_id, "status": "late"}, headers=headers)
+        res = await client.get(url, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert res.headers["etag"] != etag
+        assert res.json()[0]["status"] == "late"
+
+        res = await client.get(f"/attendance/student/{student_id}/calendar/?month=2999-01", headers=headers)
+        assert res.json() == []
+        assert res.headers["cache-control"] == "private, no-cache"
+
+
+@pytest.mark.asyncio
+async def test_calendar_write_during_render_is_not_overwritten(monkeypatch):
+    from uuid import uuid4
+    import routers.attendance as attendance_router
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_etag_race@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_etag_race@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        student_id = str(uuid4())
+        res = await client.post("/attendance/", json={
+            "date": "2024-10-08",
+            "teacher_id": str(uuid4()),
+            "subject": "Civics",
+            "class_name": "ETAG-3",
+            "records": [{"student_id": student_id, "status": "absent"}],
+        }, headers=headers)
+        session_id = res.json()["id"]
+        url = f"/attendance/student/{student_id}/calendar/?month=2024-10"
+
+        # the PATCH commits after the read has run its query but before it caches the body
+        render = attendance_router._render_calendar
+        async def render_then_write(*args):
+            body = await render(*args)
+            monkeypatch.setattr(attendance_router, "_render_calendar", render)
+            await client.patch(f"/attendance/session/{session_id}/update",
+                               json={"student_id": student_id, "status": "present"}, headers=headers)
+            return body
+        monkeypatch.setattr(attendance_router, "_render_calendar", render_then_write)
+
+        stale = await client.get(url, headers=headers)
+        assert stale.json()[0]["status"] == "absent"
+        res = await client.get(url, headers={**headers, "If-None-Match": stale.headers["etag"]})
+        assert res.status_code == 200
+        assert res.json()[0]["status"] == "present"
+
+
+@pytest.mark.asyncio
+async def test_calendar_current_month_is_rendered_fresh_with_etag():
+    from uuid import uuid4
+    from routers.attendance import calendar_cache
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_etag_now@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_etag_now@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        student_id = str(uuid4())
+        today = date.today()
+        await client.post("/attendance/", json={
+            "date": today.isoformat(),
+            "teacher_id": str(uuid4()),
+            "subject": "Civics",
+            "class_name": "ETAG-4",
+            "records": [{"student_id": student_id, "status": "present"}],
+        }, headers=headers)
+        url = f"/attendance/student/{student_id}/calendar/?month={today:%Y-%m}"
+
+        lookups = calendar_cache.hits + calendar_cache.misses
+        first = await client.get(url, headers=headers)
+        assert first.headers["cache-control"] == "private, no-cache"
+        res = await client.get(url, headers={**headers, "If-None-Match": first.headers["etag"]})
+        assert res.status_code == 304
+        assert calendar_cache.hits + calendar_cache.misses == lookups
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_sessions_and_records_without_gaps():
+    from uuid import uuid4
+    from models.classroom import Classroom
+    from routers.attendance import NEXT_CURSOR_HEADER, _encode_cursor, _paginate
+
+    with Session(engine) as session:
+        classroom = Classroom(name="CURSOR-11")
+        session.add(classroom)
+        session.flush()
+        pupils = [Student(name=f"Cursor {i}", class_id=classroom.id) for i in range(2)]
+        session.add_all(pupils)
+        session.commit()
+        pupil_ids = [str(p.id) for p in pupils]
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_cursor@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_cursor@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        teacher_id = str(uuid4())
+        for day in ("2041-01-01", "2041-01-02", "2041-01-02", "2041-01-03", "2041-01-04"):
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": teacher_id,
+                "subject": "Logic",
+                "class_name": "CURSOR-11",
+                "records": [{"student_id": sid, "status": "present"} for sid in pupil_ids],
+            }, headers=headers)
+
+        async def walk(url, params):
+            seen, cursor = [], None
+            while True:
+                res = await client.get(url, params={**params, **({"cursor": cursor} if cursor else {})},
+                                       headers=headers)
+                assert res.status_code == 200
+                seen.extend(res.json())
+                cursor = res.headers.get(NEXT_CURSOR_HEADER)
+                if cursor is None:
+                    return seen
+
+        sessions = await walk("/attendance/sessions/", {"teacher_id": teacher_id, "limit": 2})
+        assert len(sessions) == len({s["id"] for s in sessions}) == 5
+        assert [s["date"] for s in sessions] == sorted((s["date"] for s in sessions), reverse=True)
+
+        res = await client.get("/attendance/sessions/", params={"teacher_id": teacher_id, "limit": 5},
+                               headers=headers)
+        assert [s["id"] for s in res.json()] == [s["id"] for s in sessions]
+        assert NEXT_CURSOR_HEADER.lower() not in res.headers
+
+        # page/limit still works, in the same order
+        res = await client.get("/attendance/sessions/", params={"teacher_id": teacher_id, "limit": 2, "page": 2},
+                               headers=headers)
+        assert [s["id"] for s in res.json()] == [s["id"] for s in sessions[2:4]]
+
+        records = await walk("/attendance/records/filter/", {"class_name": "CURSOR-11", "limit": 3})
+        assert len(records) == len({r["id"] for r in records}) == 10
+
+        res = await client.get("/attendance/sessions/", params={"cursor": "not-a-cursor"}, headers=headers)
+        assert res.status_code == 400
+
+    deep_page = _paginate(
+        select(AttendanceSession), _encode_cursor(date(2041, 1, 2), UUID(int=0)),
+        1, 10, AttendanceSession.date, AttendanceSession.id,
+    )
+    plan = _query_plan(deep_page)
+    assert "ix_attendancesession_date_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.asyncio
+async def test_create_rejects_a_student_listed_twice():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_twice@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_twice@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        twice = str(uuid4())
+        res = await client.post("/attendance/", json={
+            "date": "2042-05-05",
+            "teacher_id": str(uuid4()),
+            "subject": "Drama",
+            "class_name": "TWICE-3",
+            "records": [
+                {"student_id": twice, "status": "present"},
+                {"student_id": str(uuid4()), "status": "present"},
+                {"student_id": twice, "status": "absent"},
+            ],
+        }, headers=headers)
+        assert res.status_code == 422
+        assert twice in res.json()["detail"]
+
+        sheet = {
+            "date": "2042-05-06",
+            "teacher_id": str(uuid4()),
+            "subject": "Drama",
+            "class_name": "TWICE-4",
+            "records": [{"student_id": twice, "status": "present"}],
+        }
+        res = await client.post("/attendance/", json=sheet, headers=headers)
+        session_id = res.json()["id"]
+        sheet["records"].append({"student_id": twice, "status": "late"})
+        res = await client.put(f"/attendance/session/{session_id}/", json=sheet, headers=headers)
+        assert res.status_code == 422
+        assert twice in res.json()["detail"]
+
+    with Session(engine) as session:
+        assert session.exec(select(AttendanceSession).where(AttendanceSession.class_name == "TWICE-3")).all() == []
+        stored = session.exec(select(AttendanceRecord).where(AttendanceRecord.session_id == UUID(session_id))).all()
+        assert [record.status for record in stored] == ["present"]
+
+
+def test_summary_refresh_upserts_over_an_existing_row():
+    from uuid import uuid4
+    from sqlalchemy import event
+    from models.attendance import AttendanceDailySummary
+    from Utilities.attendance_summary import refresh_daily_summary
+
+    key = (date(2043, 3, 3), "UPSERT-1", "Art")
+    gone = (date(2043, 3, 4), "UPSERT-1", "Art")
+    with Session(engine) as session:
+        sheet = AttendanceSession(date=key[0], teacher_id=uuid4(), subject=key[2], class_name=key[1])
+        session.add(sheet)
+        session.flush()
+        session.add_all([
+            AttendanceRecord(session_id=sheet.id, student_id=uuid4(), status="present"),
+            AttendanceRecord(session_id=sheet.id, student_id=uuid4(), status="absent"),
+        ])
+        # rows committed by another writer: one stale, one for a key that has no records left
+        session.add(AttendanceDailySummary(date=key[0], class_name=key[1], subject=key[2], present=9, total=9))
+        session.add(AttendanceDailySummary(date=gone[0], class_name=gone[1], subject=gone[2], late=1, total=1))
+        session.commit()
+
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        with Session(engine) as session:
+            refresh_daily_summary(session, [key, gone])
+            session.commit()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    # the existing row is claimed with an upsert, never deleted and re-inserted, so a concurrent
+    # writer waits on it instead of hitting a primary key violation
+    writes = [s for s in statements if "attendancedailysummary" in s.split("(")[0]]
+    assert writes[0].startswith("INSERT INTO attendancedailysummary") and "ON CONFLICT" in writes[0]
+    assert "ON CONFLICT" in writes[1]
+
+    with Session(engine) as session:
+        row = session.get(AttendanceDailySummary, key)
+        assert (row.present, row.absent, row.late, row.total) == (1, 1, 0, 2)
+        assert session.get(AttendanceDailySummary, gone) is None
+
+
+@pytest.mark.asyncio
+async def test_batch_client_keys_are_scoped_per_teacher():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_keyscope@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_keyscope@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        def sheet(teacher_id):
+            return {
+                "client_key": "session-1",  # both devices start counting from the same key
+                "date": "2044-08-08",
+                "teacher_id": teacher_id,
+                "subject": "Urdu",
+                "class_name": "KEYSCOPE-4",
+                "records": [{"student_id": str(uuid4()), "status": "present"}],
+            }
+
+        first_teacher, second_teacher = str(uuid4()), str(uuid4())
+        res = await client.post("/attendance/batch", json={"sessions": [sheet(first_teacher)]}, headers=headers)
+        first = res.json()["results"][0]
+        res = await client.post("/attendance/batch", json={"sessions": [sheet(second_teacher)]}, headers=headers)
+        second = res.json()["results"][0]
+        assert first["status"] == second["status"] == "created"
+        assert first["session_id"] != second["session_id"]
+
+        res = await client.post("/attendance/batch", json={"sessions": [sheet(second_teacher)]}, headers=headers)
+        replay = res.json()["results"][0]
+        assert replay["status"] == "duplicate"
+        assert replay["session_id"] == second["session_id"]
+
+
+@pytest.mark.asyncio
+async def test_next_cursor_header_is_exposed_to_cross_origin_clients():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "teacher_cors@attend.com",
+            "password": "teacherpass",
+            "role": "teacher"
+        })
+        res = await client.post("/login", json={
+            "email": "teacher_cors@attend.com",
+            "password": "teacherpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}", "Origin": "https://dashboard.example"}
+
+        teacher_id = str(uuid4())
+        for day in ("2045-01-01", "2045-01-02"):
+            await client.post("/attendance/", json={
+                "date": day,
+                "teacher_id": teacher_id,
+                "subject": "Art",
+                "class_name": "CORS-1",
+                "records": [{"student_id": str(uuid4()), "status": "present"}],
+            }, headers=headers)
+
+        res = await client.get("/attendance/sessions/", params={"teacher_id": teacher_id, "limit": 1}, headers=headers)
+        assert res.status_code == 200
+        assert "x-next-cursor" in res.headers
+        exposed = [h.strip().lower() for h in res.headers["access-control-expose-headers"].split(",")]
+        assert "x-next-cursor" in exposed
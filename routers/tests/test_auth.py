@@ -1,4 +1,6 @@
+import threading
 import pytest
+from unittest.mock import patch
 from httpx import AsyncClient, ASGITransport
 from sqlmodel import SQLModel, create_engine, Session
 from main import app
@@ -99,6 +101,10 @@ async def test_auth_crud_flow():
         }, headers={"Authorization": f"Bearer {admin_token}"})
         assert reset.status_code == 200
 
+        # ---------- Tokens issued before the reset are revoked ----------
+        stale = await client.get("/me", headers={"Authorization": f"Bearer {student_token}"})
+        assert stale.status_code == 401
+
         # ---------- Login with new password ----------
         relogin = await client.post("/login", json={
             "email": student_email,
@@ -109,3 +115,92 @@ async def test_auth_crud_flow():
         # ---------- /users/{id} DELETE ----------
         delete = await client.delete(f"/users/{admin_user_id}", headers={"Authorization": f"Bearer {admin_token}"})
         assert delete.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hash_pool_is_saturated():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "burst@example.com",
+            "password": "burstpass",
+            "role": "student"
+        })
+        with patch("Utilities.security._hash_slots", threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            res = await client.post("/login", json={
+                "email": "burst@example.com",
+                "password": "burstpass"
+            })
+        assert res.status_code == 503
+        assert res.headers["retry-after"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_bulk_registration_reports_per_row_conflicts():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        with Session(engine) as session:
+            session.add(User(
+                email="bulk_admin@example.com",
+                hashed_password=hash_password("adminpass"),
+                role="admin"
+            ))
+            session.commit()
+        res = await client.post("/login", json={
+            "email": "bulk_admin@example.com",
+            "password": "adminpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        res = await client.post("/admin/register-bulk", json=[
+            {"email": "bulk1@example.com", "password": "pass1"},
+            {"email": "bulk_admin@example.com", "password": "pass2"},
+            {"email": "bulk1@example.com", "password": "pass3"},
+            {"email": "bulk2@example.com", "password": "pass4", "role": "wizard"},
+            {"email": "bulk3@example.com", "password": "pass5", "role": "teacher"},
+            {"email": 5, "password": "pass8"},
+        ], headers=headers)
+        assert res.status_code == 200
+        body = res.json()
+        assert (body["created"], body["conflicts"], body["invalid"]) == (2, 2, 2)
+        assert [r["status"] for r in body["results"]] == ["created", "conflict", "conflict", "invalid", "created", "invalid"]
+        assert body["results"][-1]["email"] is None
+
+        csv_body = "email,password,role\nbulk4@example.com,pass6,\nbulk3@example.com,pass7,student\n"
+        res = await client.post("/admin/register-bulk/csv", files={"file": ("users.csv", csv_body, "text/csv")},
+                                headers=headers)
+        assert res.status_code == 200
+        assert [r["status"] for r in res.json()["results"]] == ["created", "conflict"]
+
+        res = await client.post("/login", json={"email": "bulk4@example.com", "password": "pass6"})
+        assert res.status_code == 200
+        assert res.json()["role"] == "student"
+
+
+@pytest.mark.asyncio
+async def test_login_upgrades_outdated_password_hash():
+    from passlib.context import CryptContext
+    from Utilities.security import needs_rehash
+
+    with Session(engine) as session:
+        user = User(
+            email="legacy_hash@example.com",
+            hashed_password=CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=4).hash("legacypass"),
+            role="student"
+        )
+        session.add(user)
+        session.commit()
+        user_id = user.id
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        res = await client.post("/login", json={
+            "email": "legacy_hash@example.com",
+            "password": "legacypass"
+        })
+        assert res.status_code == 200
+
+    with Session(engine) as session:
+        upgraded = session.get(User, user_id).hashed_password
+    assert not needs_rehash(upgraded)
@@ -1,9 +1,10 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
-from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel import SQLModel, create_engine, Session, select
 from main import app
 from database import get_session
 from Utilities.security import hash_password
+from uuid import UUID
 
 # ✅ Import all models to register with metadata
 from models.users import User
@@ -94,3 +95,36 @@ async def test_fee_receipt_crud_flow():
             headers={"Authorization": f"Bearer {student_token}"})
         assert by_student_res.status_code == 200
         assert any(r["id"] == receipt_id for r in by_student_res.json())
+
+
+@pytest.mark.asyncio
+async def test_fee_receipt_retry_with_idempotency_key_is_not_duplicated():
+    from uuid import uuid4
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.post("/register", json={
+            "email": "retry_parent@example.com",
+            "password": "parentpass",
+            "role": "student"
+        })
+        res = await client.post("/login", json={
+            "email": "retry_parent@example.com",
+            "password": "parentpass"
+        })
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}", "Idempotency-Key": "pay-7781"}
+
+        student_id = str(uuid4())
+        receipt_data = {"student_id": student_id, "total_amount": 900.0, "payment_reference": "TXN-RETRY"}
+        first = await client.post("/fee-receipts/", json=receipt_data, headers=headers)
+        retry = await client.post("/fee-receipts/", json=receipt_data, headers=headers)
+        assert first.status_code == retry.status_code == 201
+        assert retry.json() == first.json()
+        assert retry.headers["idempotent-replayed"] == "true"
+
+        res = await client.post("/fee-receipts/", json={**receipt_data, "total_amount": 1.0}, headers=headers)
+        assert res.status_code == 422
+
+        with Session(engine) as session:
+            stored = session.exec(select(FeeReceipt).where(FeeReceipt.student_id == UUID(student_id))).all()
+        assert len(stored) == 1
@@ -1,9 +1,12 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from uuid import UUID
 from main import app
-from database import get_session
+from database import get_session, get_async_session
 from Utilities.security import hash_password
 
 # ✅ Register models with metadata
@@ -15,6 +18,7 @@ from models.notifications import Notification
 
 DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
 
 # ✅ Override DB session
 def override_get_session():
@@ -23,6 +27,12 @@ def override_get_session():
 
 app.dependency_overrides[get_session] = override_get_session
 
+async def override_get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+app.dependency_overrides[get_async_session] = override_get_async_session
+
 @pytest.fixture(scope="module", autouse=True)
 def setup_database():
     SQLModel.metadata.create_all(engine)
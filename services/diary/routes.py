@@ -1,8 +1,8 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query, Body
 from typing import Optional, Union
 from uuid import UUID
-from sqlmodel import select
-from database import SessionDep
+from sqlmodel import select, func
+from database import SessionDep, AsyncSessionDep
 from Utilities.auth import require_min_role
 from Utilities.s3bucketupload import upload_to_s3, delete_from_s3
 from services.diary.models import DiaryItem, DiaryCreate, DiaryUpdate, DiaryRead, DiaryPaginationResponse
@@ -71,26 +71,26 @@ def get_all_diary_items(
     }
 
 @Diary_router.get("/by-class", response_model=DiaryPaginationResponse)
-def get_diary_by_classname(
-    session: SessionDep,
+async def get_diary_by_classname(
+    session: AsyncSessionDep,
     classname: str = Query(..., min_length=1),
     offset: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
 ):
-    total_items = session.exec(
-        select(DiaryItem).where(DiaryItem.classname == classname)
-    ).all()
+    total_items = (await session.exec(
+        select(func.count()).select_from(DiaryItem).where(DiaryItem.classname == classname)
+    )).one()
 
-    paginated_items = session.exec(
+    paginated_items = (await session.exec(
         select(DiaryItem)
         .where(DiaryItem.classname == classname)
         .order_by(DiaryItem.creation_date.desc())
         .offset(offset)
         .limit(limit)
-    ).all()
+    )).all()
 
     return DiaryPaginationResponse(
-        total=len(total_items),
+        total=total_items,
         offset=offset,
         limit=limit,
         items=paginated_items
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from sqlmodel import select
+from sqlmodel import select, func
 from uuid import UUID
 from typing import List
-from database import SessionDep
+from database import SessionDep, AsyncSessionDep
 from Utilities.auth import require_min_role
 from services.feepost.models import FeePost, FeePostCreate, FeePostRead, FeePostPaginationResponse, FeePostUpdateStatus
 # from routers.fee_recipt import create_fee_receipt
@@ -33,42 +33,42 @@ def delete_fee_post(fee_id: UUID, session: SessionDep):
     return {"ok": True}
 
 @fee_router.get("/", response_model=FeePostPaginationResponse)
-def get_all_fee_posts(session: SessionDep, offset: int = Query(0, ge=0), limit: int = Query(10, le=100)):
-    total_items = session.exec(select(FeePost)).all()
-    paginated_items = session.exec(
+async def get_all_fee_posts(session: AsyncSessionDep, offset: int = Query(0, ge=0), limit: int = Query(10, le=100)):
+    total_items = (await session.exec(select(func.count()).select_from(FeePost))).one()
+    paginated_items = (await session.exec(
         select(FeePost)
         .order_by(FeePost.creation_date.desc())
         .offset(offset)
         .limit(limit)
-    ).all()
+    )).all()
     return {
-        "total": len(total_items),
+        "total": total_items,
         "offset": offset,
         "limit": limit,
         "items": paginated_items,
     }
 
 @fee_router.get("/by-student", response_model=FeePostPaginationResponse)
-def get_fee_posts_by_student(
-    session: SessionDep,
+async def get_fee_posts_by_student(
+    session: AsyncSessionDep,
     student_id: UUID = Query(...),
     offset: int = Query(0, ge=0),
     limit: int = Query(10, le=100),
 ):
-    total_items = session.exec(
-        select(FeePost).where(FeePost.student_id == student_id)
-    ).all()
+    total_items = (await session.exec(
+        select(func.count()).select_from(FeePost).where(FeePost.student_id == student_id)
+    )).one()
 
-    paginated_items = session.exec(
+    paginated_items = (await session.exec(
         select(FeePost)
         .where(FeePost.student_id == student_id)
         .order_by(FeePost.creation_date.desc())
         .offset(offset)
         .limit(limit)
-    ).all()
+    )).all()
 
     return FeePostPaginationResponse(
-        total=len(total_items),
+        total=total_items,
         offset=offset,
         limit=limit,
         items=paginated_items
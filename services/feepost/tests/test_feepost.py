@@ -1,10 +1,13 @@
 import pytest
 from httpx import AsyncClient, ASGITransport
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from uuid import uuid4
 from datetime import datetime, timedelta, timezone
 from main import app
-from database import get_session
+from database import get_session, get_async_session
 
 from models.students import Student
 from services.feepost.models import FeeMode
@@ -12,6 +15,7 @@ from services.feepost.models import FeeMode
 # Set up test DB
 DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
 
 def override_get_session():
     with Session(engine) as session:
@@ -19,6 +23,12 @@ def override_get_session():
 
 app.dependency_overrides[get_session] = override_get_session
 
+async def override_get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+app.dependency_overrides[get_async_session] = override_get_async_session
+
 @pytest.fixture(scope="module", autouse=True)
 def setup_db():
     SQLModel.metadata.create_all(engine)